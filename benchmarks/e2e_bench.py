@@ -0,0 +1,438 @@
+"""
+Сквозной нагрузочный тест бота.
+
+Поднимает локальную замену API бэкенда (aiohttp, с задержкой и долей
+ошибок) и подменяет сессию Telegram Bot API. Синтетические пользователи
+проходят через настоящий `Dispatcher` путь /start → ContactSG → StartSG →
+ServicesSG (специалист, услуга, дата, время, подтверждение). Результат —
+JSON с апдейтами в секунду, перцентилями времени обработки апдейта,
+запросами к бэкенду на одну запись и памятью на сессию.
+
+Пользователи нажимают кнопки без пауз, поэтому около 1% из них получают
+`UnknownIntent`: aiogram_dialog строит ID контекста из текущей секунды и
+случайного числа до 100, и два диалога, открытые одним пользователем в
+одну секунду, иногда получают один ID. Такие пути попадают в
+`outcomes.exception`.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.e2e_bench --users 2000 --concurrency 200 --output e2e.json
+    python -m benchmarks.e2e_bench --users 2000 --baseline e2e.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import re
+import resource
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.base import BaseSession
+from aiogram.enums import ParseMode
+from aiogram.methods import TelegramMethod
+from aiogram.types import Chat, InlineKeyboardMarkup, Message, Update
+from aiohttp import web
+
+TOKEN = "123456:" + "A" * 35
+DAY_START, DAY_END, STEP = 9 * 60, 21 * 60, 30
+# Занятое время каждого специалиста в каждый день: 10:00–11:00 и 15:00–15:30
+BOOKED = ((10 * 60, 11 * 60), (15 * 60, 15 * 60 + 30))
+SERVICES = [
+    {"id": 1, "name": "Стрижка", "duration": 60},
+    {"id": 2, "name": "Борода", "duration": 30},
+    {"id": 3, "name": "Стрижка и борода", "duration": 90},
+    {"id": 4, "name": "Камуфляж седины", "duration": 45},
+]
+
+
+# --- бэкенд -------------------------------------------------------------
+
+
+class FakeBackend:
+    """
+    Замена API бэкенда с теми же маршрутами, что вызывает бот.
+    """
+
+    def __init__(self, specialists: int, latency: float, error_rate: float, days: int = 45):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.specialists = [{"id": i, "name": f"Мастер {i}"} for i in range(1, specialists + 1)]
+        self.days = days
+        self.users: Dict[int, Dict[str, Any]] = {}
+        self.calls: Counter = Counter()
+        self.errors = 0
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get("/users/{tg_id}", self.get_user)
+        app.router.add_post("/users", self.create_user)
+        app.router.add_get("/specialists", self.get_specialists)
+        app.router.add_get("/services", self.get_services)
+        app.router.add_get("/work_schedules/specialist/{specialist_id}", self.get_schedule)
+        app.router.add_get("/bookings", self.get_bookings)
+        app.router.add_get("/available_times", self.get_available_times)
+        return app
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        self.calls[f"{request.method} {request.match_info.route.resource.canonical}"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+        if self.error_rate and random.random() < self.error_rate:
+            self.errors += 1
+            return web.json_response({"detail": "synthetic error"}, status=500)
+        return await handler(request)
+
+    async def get_user(self, request: web.Request) -> web.Response:
+        user = self.users.get(int(request.match_info["tg_id"]))
+        if user is None:
+            return web.json_response({"detail": "not found"}, status=404)
+        return web.json_response(user)
+
+    async def create_user(self, request: web.Request) -> web.Response:
+        user = await request.json()
+        if user["tgID"] in self.users:
+            return web.json_response({"detail": "exists"}, status=409)
+        self.users[user["tgID"]] = user
+        return web.json_response(user, status=201)
+
+    async def get_specialists(self, request: web.Request) -> web.Response:
+        return web.json_response(self.specialists)
+
+    async def get_services(self, request: web.Request) -> web.Response:
+        return web.json_response(SERVICES)
+
+    async def get_schedule(self, request: web.Request) -> web.Response:
+        today = date.today()
+        return web.json_response([
+            {"date": (today + timedelta(days=i)).isoformat(), "start_time": "09:00", "end_time": "21:00"}
+            for i in range(self.days)
+        ])
+
+    async def get_bookings(self, request: web.Request) -> web.Response:
+        first = date.fromisoformat(request.query["date_from"])
+        last = date.fromisoformat(request.query["date_to"])
+        return web.json_response([
+            {"booking_date": (first + timedelta(days=i)).isoformat(), "booking_time": _hhmm(start), "duration": end - start}
+            for i in range((last - first).days + 1)
+            for start, end in BOOKED
+        ])
+
+    async def get_available_times(self, request: web.Request) -> web.Response:
+        duration = next(s["duration"] for s in SERVICES if s["id"] == int(request.query["service_id"]))
+        day = date.fromisoformat(request.query["booking_date"])
+        now = datetime.now()
+        earliest = now.hour * 60 + now.minute if day == now.date() else 0
+        return web.json_response([
+            _hhmm(start)
+            for start in range(DAY_START, DAY_END - duration + 1, STEP)
+            if start >= earliest and all(start + duration <= b or start >= e for b, e in BOOKED)
+        ])
+
+
+def _hhmm(minute: int) -> str:
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+# --- Telegram -------------------------------------------------------------
+
+
+class FakeTelegramSession(BaseSession):
+    """
+    Сессия Bot API без сети: отвечает на методы синтетическими объектами
+    и запоминает клавиатуры отправленных сообщений по чатам.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.calls: Counter = Counter()
+        self.keyboards: Dict[int, Dict[int, InlineKeyboardMarkup]] = {}
+        self.texts: Dict[int, Dict[int, str]] = {}
+        self.history: Dict[int, List[str]] = {}
+        self._message_ids = itertools.count(1)
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        name = type(method).__name__
+        self.calls[name] += 1
+        chat_id = getattr(method, "chat_id", None)
+        if name in ("SendMessage", "EditMessageText", "EditMessageReplyMarkup"):
+            message_id = getattr(method, "message_id", None) or next(self._message_ids)
+            markup = method.reply_markup if isinstance(method.reply_markup, InlineKeyboardMarkup) else None
+            text = getattr(method, "text", None)
+            if markup is not None:
+                self.keyboards.setdefault(chat_id, {})[message_id] = markup
+            else:
+                self.keyboards.get(chat_id, {}).pop(message_id, None)
+            if text is not None:
+                self.texts.setdefault(chat_id, {})[message_id] = text
+                self.history.setdefault(chat_id, []).append(text)
+            return Message(
+                message_id=message_id,
+                date=datetime.now(),
+                chat=Chat(id=chat_id, type="private"),
+                text=text or self.texts.get(chat_id, {}).get(message_id),
+                reply_markup=markup,
+            ).as_(bot)
+        if name == "DeleteMessage":
+            self.keyboards.get(chat_id, {}).pop(method.message_id, None)
+        return True
+
+    async def stream_content(self, *args, **kwargs) -> AsyncGenerator[bytes, None]:
+        raise NotImplementedError
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+    def last_keyboard(self, chat_id: int):
+        keyboards = self.keyboards.get(chat_id)
+        if not keyboards:
+            return None, None
+        message_id = max(keyboards)
+        return message_id, keyboards[message_id]
+
+    def has_text(self, chat_id: int, fragment: str) -> bool:
+        return any(fragment in text for text in self.history.get(chat_id, ()))
+
+
+# --- пользователи ---------------------------------------------------------
+
+
+class FlowError(Exception):
+    pass
+
+
+DAY_BUTTON = re.compile(r"^\d{1,2}(·[1-9]\d*)?$")
+
+
+class Driver:
+    """
+    Отправляет апдейты в диспетчер и измеряет время обработки каждого.
+    """
+
+    def __init__(self, bot: Bot, dp: Dispatcher, session: FakeTelegramSession):
+        self.bot = bot
+        self.dp = dp
+        self.session = session
+        self.latencies: List[float] = []
+        self.failed_updates = 0
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(10 ** 9)
+
+    async def feed(self, payload: Dict[str, Any]) -> None:
+        update = Update.model_validate({"update_id": next(self._update_ids), **payload}, context={"bot": self.bot})
+        started = time.perf_counter()
+        try:
+            await self.dp.feed_update(self.bot, update)
+        except Exception:
+            self.failed_updates += 1
+            raise
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+    async def message(self, user_id: int, **content) -> None:
+        await self.feed({"message": {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": _user(user_id),
+            **content,
+        }})
+
+    async def click(self, user_id: int, match) -> None:
+        message_id, markup = self.session.last_keyboard(user_id)
+        if markup is None:
+            raise FlowError("нет клавиатуры")
+        buttons = [button for row in markup.inline_keyboard for button in row if button.callback_data]
+        button = match(buttons)
+        if button is None:
+            raise FlowError(f"нет кнопки среди {[b.text for b in buttons]}")
+        await self.feed({"callback_query": {
+            "id": str(next(self._message_ids)),
+            "from": _user(user_id),
+            "chat_instance": str(user_id),
+            "message": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "text": "…",
+            },
+            "data": button.callback_data,
+        }})
+
+
+def _user(user_id: int) -> Dict[str, Any]:
+    return {"id": user_id, "is_bot": False, "first_name": "User", "username": f"user{user_id}", "language_code": "ru"}
+
+
+def _text(text: str):
+    return lambda buttons: next((b for b in buttons if b.text == text), None)
+
+
+def _prefix(prefix: str, rng: random.Random):
+    def match(buttons):
+        found = [b for b in buttons if b.text.startswith(prefix)]
+        return rng.choice(found) if found else None
+    return match
+
+
+def _first(pattern: re.Pattern):
+    return lambda buttons: next((b for b in buttons if pattern.match(b.text)), None)
+
+
+async def book(driver: Driver, user_id: int, rng: random.Random) -> bool:
+    """
+    Полный путь одного пользователя до подтверждения времени.
+    """
+    await driver.message(user_id, text="/start")
+    _, markup = driver.session.last_keyboard(user_id)
+    if markup is not None and any(b.text == "✔️" for row in markup.inline_keyboard for b in row):
+        await driver.click(user_id, _text("✔️"))
+        await driver.message(user_id, contact={
+            "phone_number": f"+7900{user_id:07d}"[-12:], "first_name": "User", "user_id": user_id,
+        })
+    await driver.click(user_id, _text("📅 Запись"))
+    await driver.click(user_id, _prefix("💈", rng))
+    await driver.click(user_id, _prefix("⚪", rng))
+    for _ in range(3):
+        _, markup = driver.session.last_keyboard(user_id)
+        if any(DAY_BUTTON.match(b.text) for row in markup.inline_keyboard for b in row):
+            break
+        await driver.click(user_id, lambda buttons: next((b for b in buttons if b.text.endswith(">>")), None))
+    await driver.click(user_id, _first(DAY_BUTTON))
+    await driver.click(user_id, _prefix("⚪", rng))
+    await driver.click(user_id, _text("Далее ➡"))
+    return driver.session.has_text(user_id, "Вы выбрали время")
+
+
+# --- запуск ---------------------------------------------------------------
+
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    backend = FakeBackend(args.specialists, args.latency, args.error_rate)
+    runner = web.AppRunner(backend.app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    os.environ["BOT_TOKEN"] = TOKEN
+    os.environ["SERVER_URL"] = f"http://127.0.0.1:{port}"
+    os.environ.setdefault("STORAGE_BACKEND", "bounded")
+    from bot import create_dispatcher
+    from core.config_data.config import load_config
+
+    logging.getLogger().setLevel(logging.DEBUG if args.verbose else logging.WARNING)
+    config = load_config()
+    session = FakeTelegramSession()
+    bot = Bot(token=TOKEN, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    dp = create_dispatcher(config)
+    driver = Driver(bot, dp, session)
+    await dp.emit_startup(bot=bot)
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    semaphore = asyncio.Semaphore(args.concurrency)
+    outcomes: Counter = Counter()
+
+    async def user_flow(user_id: int) -> None:
+        async with semaphore:
+            try:
+                outcomes["booked" if await book(driver, user_id, random.Random(user_id)) else "unconfirmed"] += 1
+            except FlowError as e:
+                outcomes["flow_error"] += 1
+                if args.verbose:
+                    print(f"user {user_id}: {e}")
+            except Exception as e:
+                outcomes["exception"] += 1
+                logging.warning("Пользователь %d: %r", user_id, e, exc_info=args.verbose)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user_flow(10 ** 6 + i) for i in range(args.users)))
+    elapsed = time.perf_counter() - started
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    storage = dp.storage
+    storage_stats = storage.stats() if hasattr(storage, "stats") else {}
+    await dp.emit_shutdown(bot=bot)
+    await runner.cleanup()
+
+    backend_calls = sum(backend.calls.values())
+    booked = outcomes["booked"]
+    return {
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "verbose")},
+        "results": {
+            "elapsed_sec": elapsed,
+            "updates": len(driver.latencies),
+            "updates_per_sec": len(driver.latencies) / elapsed,
+            "latency_p50_ms": percentile(driver.latencies, 0.50) * 1e3,
+            "latency_p95_ms": percentile(driver.latencies, 0.95) * 1e3,
+            "latency_p99_ms": percentile(driver.latencies, 0.99) * 1e3,
+            "bookings": booked,
+            "bookings_per_sec": booked / elapsed,
+            "backend_calls": backend_calls,
+            "backend_calls_per_booking": backend_calls / booked if booked else None,
+            "backend_errors": backend.errors,
+            "telegram_calls": sum(session.calls.values()),
+            "telegram_calls_per_booking": sum(session.calls.values()) / booked if booked else None,
+            "session_bytes": storage_stats.get("bytes_per_session"),
+            "rss_kb_per_user": (rss_after - rss_before) / args.users,
+            "failed_updates": driver.failed_updates,
+        },
+        "outcomes": dict(outcomes),
+        "backend_calls_by_route": dict(backend.calls),
+        "telegram_calls_by_method": dict(session.calls),
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Отношение текущих метрик к базовым (>1 — значение выросло).
+    """
+    result = {}
+    for key, value in current["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if isinstance(value, (int, float)) and isinstance(base, (int, float)) and base:
+            result[key] = round(value / base, 3)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100, help="одновременно активных пользователей")
+    parser.add_argument("--specialists", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.005, help="средняя задержка бэкенда, сек.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 500 от бэкенда")
+    parser.add_argument("--output", help="куда сохранить JSON с результатами")
+    parser.add_argument("--baseline", help="JSON прошлого запуска для сравнения")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["vs_baseline"] = compare(report, json.load(f))
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
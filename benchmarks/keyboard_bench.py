@@ -0,0 +1,99 @@
+"""
+Рендер клавиатур выбора специалиста и услуги: `Select`/`Radio` с
+шаблонами `Format` против общих клавиатур `CatalogSelect`/`CatalogRadio`.
+
+Каждый рендер — отдельный пользователь; в `Radio` у части пользователей
+уже отмечена услуга. Результат — JSON с микросекундами на рендер.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.keyboard_bench --items 10 --renders 20000
+"""
+import argparse
+import asyncio
+import json
+import operator
+import time
+from typing import Any, Dict
+
+from aiogram_dialog.widgets.kbd import Radio, Select
+from aiogram_dialog.widgets.text import Format
+
+from core.cache.catalog import Catalog
+from core.dialogs.catalog_kbd import CatalogRadio, CatalogSelect
+
+
+class _Context:
+    def __init__(self):
+        self.widget_data: Dict[str, Any] = {}
+
+
+class FakeManager:
+    """
+    Минимум `DialogManager`, который нужен виджетам при рендере.
+    """
+
+    def __init__(self):
+        self.context = _Context()
+
+    def current_context(self) -> _Context:
+        return self.context
+
+    def is_preview(self) -> bool:
+        return False
+
+
+async def measure(widget, key: str, catalog: Catalog, renders: int, checked_every: int) -> float:
+    managers = [FakeManager() for _ in range(64)]
+    for i, manager in enumerate(managers):
+        if checked_every and i % checked_every == 0:
+            manager.context.widget_data[widget.widget_id] = str(catalog.items[i % len(catalog)].id)
+    # Общие виджеты получают каталог, обычные — его записи, как до перехода на них
+    data = {key: catalog if isinstance(widget, (CatalogSelect, CatalogRadio)) else catalog.items}
+    await widget.render_keyboard(data, managers[0])
+    started = time.perf_counter()
+    for i in range(renders):
+        await widget.render_keyboard(data, managers[i % len(managers)])
+    return (time.perf_counter() - started) / renders * 1e6
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    specialists = Catalog.from_payload({"id": i, "name": f"Мастер {i}"} for i in range(1, args.items + 1))
+    services = Catalog.from_payload(
+        {"id": i, "name": f"Услуга {i}", "duration": 30} for i in range(1, args.items + 1)
+    )
+    select = Select(
+        Format('💈 {item.name} 💈'), id='spec', item_id_getter=operator.attrgetter("id"), items='specialists',
+    )
+    radio = Radio(
+        checked_text=Format("🔘 {item.name}"), unchecked_text=Format("⚪ {item.name}"),
+        id="services_radio", item_id_getter=operator.attrgetter("id"), items="services",
+    )
+    shared_select = CatalogSelect(Format('💈 {item.name} 💈'), id='spec', items='specialists')
+    shared_radio = CatalogRadio(
+        checked_text=Format("🔘 {item.name}"), unchecked_text=Format("⚪ {item.name}"),
+        id="services_radio", items="services",
+    )
+    result = {
+        "items": args.items,
+        "renders": args.renders,
+        "select_us": await measure(select, "specialists", specialists, args.renders, 0),
+        "catalog_select_us": await measure(shared_select, "specialists", specialists, args.renders, 0),
+        "radio_us": await measure(radio, "services", services, args.renders, 2),
+        "catalog_radio_us": await measure(shared_radio, "services", services, args.renders, 2),
+    }
+    result["select_speedup"] = result["select_us"] / result["catalog_select_us"]
+    result["radio_speedup"] = result["radio_us"] / result["catalog_radio_us"]
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=10)
+    parser.add_argument("--renders", type=int, default=20000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
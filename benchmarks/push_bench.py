@@ -0,0 +1,203 @@
+"""
+Доставка уведомлений об изменениях до кэшей бота.
+
+Поднимает локальную замену бэкенда с маршрутами каталога, расписаний
+и SSE-потоком `/events` и проверяет три пути:
+
+- `sse` — уведомление с новым каталогом уходит в поток;
+- `http` — то же уведомление приходит POST-запросом на приёмник бота;
+- `poll` — поток недоступен, данные меняются на сервере без уведомлений
+  и попадают в кэш опросом (`--poll-interval`), а после восстановления
+  потока — внеочередной перезагрузкой.
+
+Результат — JSON с перцентилями задержки от изменения до кэша.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.push_bench --changes 200 --poll-interval 0.5
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+import aiohttp
+from aiohttp import web
+
+from benchmarks.e2e_bench import SERVICES, percentile
+from core.api.client import BackendClient
+from core.cache.heatmap import AvailabilityHeatmap
+from core.cache.invalidation import Invalidator
+from core.cache.nearest import NearestSlots
+from core.cache.schedule import ScheduleIndex
+from core.cache.slots import SlotEngine
+from core.cache.swr import SWRCache
+from core.config_data.config import FastBooking, Heatmap, Push, Server, Slots
+from core.handlers.services_handlers.schedule import load_schedule
+from core.handlers.services_handlers.service import load_services_catalog
+from core.server.push import PushChannel
+
+SECRET = "bench-secret"
+SPECIALISTS = [{"id": i, "name": f"Мастер {i}"} for i in range(1, 6)]
+
+
+class PushBackend:
+    """
+    Замена бэкенда: каталог и расписания меняются вызовами бенчмарка.
+    """
+
+    def __init__(self):
+        self.services = [dict(item) for item in SERVICES]
+        self.end_time = "21:00"
+        self.streams: Set[asyncio.Queue] = set()
+        self.available = True
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/services", lambda request: web.json_response(self.services))
+        app.router.add_get("/specialists", lambda request: web.json_response(SPECIALISTS))
+        app.router.add_get("/work_schedules/specialist/{specialist_id}", self.get_schedule)
+        app.router.add_get("/events", self.events)
+        return app
+
+    async def get_schedule(self, request: web.Request) -> web.Response:
+        today = date.today()
+        return web.json_response([
+            {"date": (today + timedelta(days=i)).isoformat(), "start_time": "09:00", "end_time": self.end_time}
+            for i in range(14)
+        ])
+
+    async def events(self, request: web.Request) -> web.StreamResponse:
+        if not self.available or request.headers.get("Authorization") != f"Bearer {SECRET}":
+            return web.json_response({"detail": "unavailable"}, status=503)
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        events: asyncio.Queue = asyncio.Queue()
+        self.streams.add(events)
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                await response.write(f"data: {json.dumps(event)}\n\n".encode())
+        finally:
+            self.streams.discard(events)
+        return response
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        for events in self.streams:
+            events.put_nowait(event)
+
+    def drop_streams(self) -> None:
+        for events in self.streams:
+            events.put_nowait(None)
+
+
+async def wait_for(condition, timeout: float) -> Optional[float]:
+    started = time.perf_counter()
+    while not condition():
+        if time.perf_counter() - started > timeout:
+            return None
+        await asyncio.sleep(0.0005)
+    return time.perf_counter() - started
+
+
+def summary(samples: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(samples),
+        "p50_ms": percentile(samples, 0.5) * 1e3,
+        "p95_ms": percentile(samples, 0.95) * 1e3,
+        "max_ms": max(samples) * 1e3 if samples else 0.0,
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    fake = PushBackend()
+    runner = web.AppRunner(fake.app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.backend_port).start()
+
+    backend = BackendClient(Server(url=f"http://127.0.0.1:{args.backend_port}"))
+    catalog = SWRCache(ttl=3600)
+    schedules = ScheduleIndex(ttl=3600)
+    slots = SlotEngine(Slots())
+    invalidator = Invalidator(catalog, schedules, slots, AvailabilityHeatmap(Heatmap()), NearestSlots(FastBooking()))
+    settings = Push(
+        http_enabled=True, port=args.push_port, secret=SECRET, sse_path="/events",
+        reconnect_delay=0.05, poll_interval=args.poll_interval,
+    )
+    channel = PushChannel(settings, backend, invalidator)
+
+    await catalog.get("services", lambda: load_services_catalog(backend))
+    for item in SPECIALISTS:
+        await load_schedule(backend, schedules, item["id"])
+    await channel.start()
+    await wait_for(lambda: channel.connected, 5.0)
+
+    def changed_services(step: int) -> List[Dict[str, Any]]:
+        fake.services[0]["name"] = f"Стрижка {step}"
+        return fake.services
+
+    def has_name(step: int):
+        return lambda: catalog.peek("services").get(1).name == f"Стрижка {step}"
+
+    results: Dict[str, Any] = {}
+    samples = []
+    for step in range(args.changes):
+        fake.publish({"type": "services", "data": changed_services(step)})
+        samples.append(await wait_for(has_name(step), 5.0))
+    results["sse"] = summary([s for s in samples if s is not None])
+
+    samples = []
+    url = f"http://127.0.0.1:{args.push_port}{settings.path}"
+    headers = {"Authorization": f"Bearer {SECRET}"}
+    async with aiohttp.ClientSession() as session:
+        for step in range(args.changes, 2 * args.changes):
+            started = time.perf_counter()
+            async with session.post(url, json={"type": "services", "data": changed_services(step)}, headers=headers) as response:
+                response.raise_for_status()
+            if await wait_for(has_name(step), 5.0) is not None:
+                samples.append(time.perf_counter() - started)
+        async with session.post(url, json={"type": "services"}) as response:
+            results["http_unauthorized_status"] = response.status
+    results["http"] = summary(samples)
+
+    # Поток недоступен: изменения доходят только опросом
+    fake.available = False
+    fake.drop_streams()
+    await wait_for(lambda: not channel.connected, 5.0)
+    before = schedules.peek(1)
+    fake.end_time = "20:00"
+    elapsed = await wait_for(lambda: schedules.peek(1) is not before, args.poll_interval * 3 + 5.0)
+    results["poll"] = {"schedule_ms": elapsed * 1e3 if elapsed is not None else None}
+
+    # После восстановления потока пропущенное перечитывается сразу
+    fake.services[0]["name"] = "После обрыва"
+    fake.available = True
+    elapsed = await wait_for(lambda: catalog.peek("services").get(1).name == "После обрыва", 35.0)
+    results["resync_ms"] = elapsed * 1e3 if elapsed is not None else None
+
+    results["channel"] = channel.stats()
+    await channel.close()
+    await catalog.close()
+    await schedules.close()
+    await slots.close()
+    await backend.close()
+    await runner.cleanup()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--changes", type=int, default=200)
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--backend-port", type=int, default=18081)
+    parser.add_argument("--push-port", type=int, default=18082)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
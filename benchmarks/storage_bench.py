@@ -0,0 +1,62 @@
+"""
+Накладные расходы хранилища FSM на одно `update_data`.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.storage_bench --users 1000 --updates 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import date
+
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from core.storage.memory import BoundedMemoryStorage
+from core.storage.sqlite import SQLiteStorage
+
+
+async def run(storage: BaseStorage, users: int, updates: int) -> dict:
+    keys = [StorageKey(bot_id=1, chat_id=i, user_id=i) for i in range(users)]
+    started = time.perf_counter()
+    for step in range(updates):
+        for key in keys:
+            await storage.update_data(key, {
+                "selected_specialist_id": step,
+                "selected_service_id": step + 1,
+                "selected_date": date(2030, 1, step % 28 + 1),
+            })
+            await storage.get_data(key)
+    elapsed = time.perf_counter() - started
+    close_started = time.perf_counter()
+    await storage.close()
+    total = users * updates
+    return {
+        "storage": type(storage).__name__,
+        "updates": total,
+        "us_per_update": elapsed / total * 1e6,
+        "close_ms": (time.perf_counter() - close_started) * 1e3,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--updates", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [
+            await run(MemoryStorage(), args.users, args.updates),
+            await run(BoundedMemoryStorage(), args.users, args.updates),
+            await run(SQLiteStorage(os.path.join(tmp, "fsm.sqlite3")), args.users, args.updates),
+        ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,56 +1,255 @@
+import time
+
+# Отсчёт для строки о времени запуска: импорт модулей бота — тоже его часть
+_IMPORT_STARTED = time.perf_counter()
+
 import asyncio
+import functools
 import logging
-
+from typing import Optional
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram_dialog import setup_dialogs
 
-from core.config_data.config import load_config
+from core.api.client import BackendClient
+from core.cache.heatmap import AvailabilityHeatmap
+from core.cache.invalidation import Invalidator
+from core.cache.nearest import NearestSlots
+from core.cache.prefetch import Prefetcher
+from core.cache.schedule import ScheduleIndex
+from core.cache.slots import SlotEngine
+from core.cache.swr import SWRCache
+from core.cache.users import UserCache
+from core.config_data.config import Config, load_config
 from core.dialogs.servises_dialog import service_dialog
 
 from core.dialogs.start_dialog import start_dialog
 from core.handlers.start import start_router
 from core.dialogs.contact_dialog import contact_dialog
+from core.log import dropped, setup_logging
+from core.metrics import BACKEND_IN_FLIGHT, BACKEND_POOL, REGISTRY, SCHEDULER_UPDATES
+from core.middlewares.dependencies import DependenciesMiddleware
+from core.middlewares.metrics import TelegramMetricsMiddleware, UpdateMetricsMiddleware
+from core.middlewares.scheduler import SchedulerMiddleware
+from core.middlewares.tracing import DispatchTracingMiddleware, TracingMiddleware
+from core.server.metrics import start_metrics_server
+from core.server.push import PushChannel
+from core.server.webhook import run_webhook
+from core.server.workers import run_supervisor, serve_worker
+from core.storage.memory import BoundedMemoryStorage
+from core.storage.metered import MeteredStorage
+from core.startup import StartupTimer, warm_up
+from core.storage.sqlite import SQLiteStorage
+from core.tracing import Tracer
 
 
-# Настраиваем базовую конфигурацию логирования
-logging.basicConfig(
-    level = logging.INFO,
-    format = '[%(asctime)s] #%(levelname)-8s %(filename)s:'
-             '%(lineno)d - %(name)s - %(message)s'
-)
-
 # Инициализируем логгер модуля
 logger = logging.getLogger(__name__)
 
 
-async def main() -> None:
-    # Загружаем конфигурацию
-    config = load_config()
+def create_storage(config: Config) -> BaseStorage:
+    storage = _create_storage(config)
+    if config.metrics.enabled or config.tracing.enabled:
+        return MeteredStorage(storage)
+    return storage
+
+
+def _create_storage(config: Config) -> BaseStorage:
+    if config.storage.backend == "sqlite":
+        return SQLiteStorage(
+            path = config.storage.path,
+            flush_interval = config.storage.flush_interval,
+            batch_size = config.storage.batch_size,
+        )
+    if config.storage.backend == "bounded":
+        return BoundedMemoryStorage(
+            idle_ttl = config.storage.idle_ttl,
+            max_sessions = config.storage.max_sessions,
+        )
+    if config.storage.backend != "memory":
+        raise ValueError(f"Неизвестное хранилище FSM: {config.storage.backend}")
+    return MemoryStorage()
+
 
-    storage = MemoryStorage()
+def create_bot(config: Config) -> Bot:
     bot = Bot(
         token = config.tg_bot.token,
         default = DefaultBotProperties(parse_mode = ParseMode.HTML)
     )
+    if config.metrics.enabled or config.tracing.enabled:
+        bot.session.middleware(TelegramMetricsMiddleware())
+    return bot
+
+
+def create_dispatcher(config: Config, port_offset: int = 0) -> Dispatcher:
+    """
+    Собрать диспетчер со всеми роутерами, кэшами и клиентом API.
+
+    Общие ресурсы закрываются в обработчике остановки диспетчера.
+    `port_offset` сдвигает порт приёмника уведомлений в воркерах.
+    """
+    REGISTRY.enabled = config.metrics.enabled
+    storage = create_storage(config)
+    backend = BackendClient(config.server, config.resilience)
+    catalog = SWRCache(ttl = config.cache.catalog_ttl)
+    schedules = ScheduleIndex(ttl = config.cache.schedule_ttl)
+    slots = SlotEngine(config.slots)
+    nearest = NearestSlots(config.fast_booking)
+    heatmap = AvailabilityHeatmap(config.heatmap)
+    slots.subscribe(heatmap.invalidate)
+    push = PushChannel(
+        config.push, backend, Invalidator(catalog, schedules, slots, heatmap, nearest), port_offset = port_offset,
+    )
+    prefetch = Prefetcher(config.prefetch)
+    users = UserCache(
+        maxsize = config.cache.users_maxsize,
+        ttl = config.cache.users_ttl,
+        negative_ttl = config.cache.users_negative_ttl,
+    )
+    scheduler = SchedulerMiddleware(config.scheduler)
     dp = Dispatcher(storage = storage)
+    tracer = Tracer(config.tracing) if config.tracing.enabled else None
+    if tracer is not None:
+        dp.update.outer_middleware(TracingMiddleware(tracer))
+        dp.update.middleware(DispatchTracingMiddleware())
+    if config.metrics.enabled:
+        # До планировщика: время апдейта включает ожидание в нём
+        dp.update.outer_middleware(UpdateMetricsMiddleware())
+        # Текущие значения считываются при каждом запросе метрик
+        BACKEND_POOL.labels("acquired").set_function(lambda: backend.pool_usage()[0])
+        BACKEND_POOL.labels("idle").set_function(lambda: backend.pool_usage()[1])
+        BACKEND_POOL.labels("limit").set(config.server.limit)
+        BACKEND_IN_FLIGHT.labels().set_function(lambda: backend.in_flight)
+        SCHEDULER_UPDATES.labels("queued").set_function(lambda: scheduler.queued)
+        SCHEDULER_UPDATES.labels("running").set_function(lambda: scheduler.running)
+    dp.update.outer_middleware(scheduler)
+    dp.update.outer_middleware(DependenciesMiddleware(
+        config = config, backend = backend, catalog = catalog, schedules = schedules, slots = slots,
+        nearest = nearest, heatmap = heatmap, prefetch = prefetch, users = users,
+    ))
 
     dp.include_routers(start_router)
     setup_dialogs(dp)
     dp.include_router(contact_dialog)
     dp.include_router(start_dialog)
     dp.include_router(service_dialog)
-     
+
+    async def on_startup() -> None:
+        if config.startup.warmup:
+            try:
+                await asyncio.wait_for(
+                    warm_up(backend, catalog, schedules, config.startup), config.startup.warmup_timeout,
+                )
+            except asyncio.TimeoutError:
+                logger.warning("Прогрев кэшей не уложился в %s с, продолжаем без него", config.startup.warmup_timeout)
+        await push.start()
+
+    async def on_shutdown() -> None:
+        await push.close()
+        logger.info("Статистика уведомлений об изменениях: %s", push.stats())
+        logger.info("Статистика пула API: %s", backend.stats())
+        logger.info("Статистика кэша каталога: %s", catalog.stats())
+        logger.info("Статистика кэша пользователей: %s", users.stats())
+        logger.info("Статистика планировщика апдейтов: %s", scheduler.stats())
+        logger.info("Статистика расчёта свободного времени: %s", slots.stats())
+        logger.info("Статистика поиска ближайшего времени: %s", nearest.stats())
+        logger.info("Статистика тепловой карты календаря: %s", heatmap.stats())
+        logger.info("Статистика упреждающей загрузки: %s", prefetch.stats())
+        if hasattr(storage, "stats"):
+            logger.info("Статистика хранилища FSM: %s", storage.stats())
+        if tracer is not None:
+            await tracer.close()
+            logger.info("Статистика трассировки: %s", tracer.stats())
+        await catalog.close()
+        await schedules.close()
+        await slots.close()
+        await prefetch.close()
+        await heatmap.close()
+        await backend.close()
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+    return dp
+
+
+def create_front_dispatcher() -> Dispatcher:
+    """
+    Диспетчер фронт-процесса в режиме воркеров.
+
+    Нужен только чтобы узнать используемые типы апдейтов, поэтому в нём
+    одни роутеры: хранилище, кэши и клиент API создаёт каждый воркер.
+    """
+    dp = Dispatcher()
+    dp.include_routers(start_router, contact_dialog, start_dialog, service_dialog)
+    return dp
+
+
+def run_worker(index: int, updates, reports, config: Optional[Config] = None) -> None:
+    """
+    Точка входа процесса-воркера в режиме WORKERS > 0.
+
+    Конфигурация приходит из главного процесса, `.env` повторно не читается.
+    """
+    config = config or load_config()
+    listener = setup_logging(config.logging)
+
+    async def serve() -> None:
+        metrics = await start_metrics_server(config.metrics, port_offset = index + 1) if config.metrics.enabled else None
+        try:
+            await serve_worker(
+                index, create_bot(config), create_dispatcher(config, port_offset = index + 1), updates, reports, config.workers,
+            )
+        finally:
+            if metrics is not None:
+                await metrics.cleanup()
+
+    try:
+        asyncio.run(serve())
+    finally:
+        listener.stop()
+
+
+async def main() -> None:
+    timer = StartupTimer()
+    timer.add("импорт", time.perf_counter() - _IMPORT_STARTED)
+    # Загружаем конфигурацию один раз; дальше она передаётся явно
+    with timer.step("конфигурация"):
+        config = load_config()
+    # Логи пишутся из фонового потока, чтобы вывод не тормозил цикл событий
+    with timer.step("логи"):
+        listener = setup_logging(config.logging)
+
+    with timer.step("бот и диспетчер"):
+        bot = create_bot(config)
+        dp = create_front_dispatcher() if config.workers.count > 0 else create_dispatcher(config)
+    logger.info("Запуск: %s", timer.summary())
+    metrics = None
+    if config.metrics.enabled and config.workers.count == 0:
+        # В режиме воркеров метрики отдаёт каждый воркер на своём порту
+        metrics = await start_metrics_server(config.metrics)
 
     try:
         logger.info("Запуск бота...")
-        await dp.start_polling(bot)
+        if config.workers.count > 0:
+            await run_supervisor(
+                bot, dp, config.workers, config.webhook, target = functools.partial(run_worker, config = config),
+            )
+        elif config.webhook.enabled:
+            await run_webhook(dp, bot, config.webhook)
+        else:
+            await dp.start_polling(bot)
     finally:
+        if metrics is not None:
+            await metrics.cleanup()
         await bot.session.close()
+        if dropped():
+            logger.warning("Отброшено записей лога из-за переполненной очереди: %d", dropped())
         logger.info("Бот остановлен.")
+        listener.stop()
 
 
 if __name__ == '__main__':
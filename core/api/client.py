@@ -0,0 +1,362 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Hashable, Mapping, Optional, Tuple
+
+import aiohttp
+from cachetools import LRUCache
+
+from core.api.resilience import CircuitBreaker, CircuitOpenError, ResiliencePolicy
+from core.api.singleflight import SingleFlight
+from core import tracing
+from core.config_data.config import Resilience, Server
+from core.metrics import BACKEND_BREAKER, BACKEND_BYTES, BACKEND_CONDITIONAL, BACKEND_HEDGES, BACKEND_SECONDS, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Числовые сегменты пути (ID) заменяются шаблоном, чтобы у метрик было немного меток
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+@dataclass
+class ApiResponse:
+    """
+    Результат запроса к API: статус и уже декодированное тело.
+
+    `not_modified` — бэкенд ответил 304, а `data` и `text` — тот же
+    объект, что и в прошлом ответе на этот запрос. `stale` — запрос не
+    отправлялся (предохранитель разомкнут), это прошлый успешный ответ.
+    """
+    status: int
+    data: Any = None
+    text: str = ""
+    not_modified: bool = False
+    stale: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+
+class BackendStatusError(aiohttp.ClientError):
+    """
+    Бэкенд ответил статусом, с которым данные не получить.
+
+    Наследует `aiohttp.ClientError`, поэтому обрабатывается там же,
+    где и сетевые ошибки.
+    """
+
+    def __init__(self, status: int, text: str):
+        super().__init__(f"{status} {text}")
+        self.status = status
+        self.text = text
+
+
+@dataclass
+class _Validated:
+    """
+    Последний успешный ответ на GET и его валидаторы для условного запроса.
+    """
+    etag: Optional[str]
+    last_modified: Optional[str]
+    response: ApiResponse
+
+    def headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class BackendClient:
+    """
+    Общий клиент API бэкенда.
+
+    Создаётся один раз в `main()`, держит пул keep-alive соединений
+    и закрывается при остановке бота.
+
+    Успешные GET-ответы запоминаются (не больше `validators_maxsize`
+    запросов). Если в ответе был `ETag` или `Last-Modified`, повторный
+    запрос уходит с `If-None-Match`/`If-Modified-Since`; на 304 тело не
+    передаётся и не декодируется: возвращаются данные прошлого ответа.
+    Они же отдаются, пока предохранитель эндпоинта разомкнут.
+    """
+
+    def __init__(self, server: Server, resilience: Optional[Resilience] = None):
+        self.base_url = server.url.rstrip("/")
+        self._server = server
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._timeout = aiohttp.ClientTimeout(total=server.timeout)
+        self._flights = SingleFlight()
+        self._policy = ResiliencePolicy(resilience or Resilience())
+        self._validators: Optional[LRUCache] = (
+            LRUCache(maxsize=server.validators_maxsize) if server.validators_maxsize > 0 else None
+        )
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.conditional = 0
+        self.not_modified = 0
+        self.bytes_received = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.rejected = 0
+        self.stale = 0
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._server.limit,
+                limit_per_host=self._server.limit_per_host,
+                ttl_dns_cache=self._server.dns_ttl,
+                keepalive_timeout=self._server.keepalive,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self._timeout)
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        json_body: Any = None,
+        timeout: Optional[float] = None,
+        allow_stale: bool = True,
+    ) -> ApiResponse:
+        """
+        Выполнить запрос к API и декодировать тело ответа.
+
+        Запрос вместе с дублем ограничен дедлайном эндпоинта (`timeout`
+        его заменяет). Если предохранитель эндпоинта разомкнут, GET получает
+        прошлый успешный ответ с `stale=True`, а без него или при
+        `allow_stale=False` (проверки перед записью) — `CircuitOpenError`.
+
+        Сетевые ошибки и таймауты (`aiohttp.ClientError`, `asyncio.TimeoutError`)
+        пробрасываются вызывающему коду.
+        """
+        url = f"{self.base_url}{path}"
+        template = endpoint(path)
+        key = _validator_key(path, params) if method == "GET" and self._validators is not None else None
+        validated: Optional[_Validated] = self._validators.get(key) if key is not None else None
+        breaker = self._policy.breaker(template)
+        if not breaker.allow():
+            return self._reject(method, template, validated if allow_stale else None)
+        # При разомкнутом предохранителе allow() пропускает только пробный запрос
+        probe = breaker.probing
+        headers = validated.headers() if validated is not None else {}
+        self.requests += 1
+        self.in_flight += 1
+        started = time.perf_counter()
+        status = "error"
+        try:
+            async with asyncio.timeout(timeout or self._policy.deadline(template)):
+                if method == "GET":
+                    status, response_headers, body = await self._hedged(template, url, params, headers)
+                else:
+                    status, response_headers, body = await self._send(template, method, url, params, json_body, headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.errors += 1
+            self._failure(breaker, method, template)
+            raise
+        except BaseException:
+            # Отмена или ошибка не со стороны бэкенда: исход пробы неизвестен
+            if probe:
+                breaker.release()
+            raise
+        finally:
+            self.in_flight -= 1
+            trace = tracing.current()
+            if REGISTRY.enabled or trace is not None:
+                finished = time.perf_counter()
+                if REGISTRY.enabled:
+                    BACKEND_SECONDS.labels(method, template, status).observe(finished - started)
+                if trace is not None:
+                    trace.add(f"{method} {template}", "backend", started, finished, {"status": status})
+
+        if status >= 500:
+            self._failure(breaker, method, template)
+        else:
+            breaker.success()
+        if headers:
+            self.conditional += 1
+            if REGISTRY.enabled:
+                BACKEND_CONDITIONAL.labels(template, "not_modified" if status == 304 else "modified").inc()
+            if status == 304:
+                self.not_modified += 1
+                return replace(validated.response, not_modified=True)
+        received = len(body)
+        self.bytes_received += received
+        if REGISTRY.enabled:
+            BACKEND_BYTES.labels(method, template).inc(received)
+        result = ApiResponse(status=status, **_decode(body))
+        if key is not None:
+            self._remember(key, status, response_headers, result)
+        return result
+
+    async def _send(
+        self,
+        template: str,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        json_body: Any,
+        headers: Dict[str, str],
+    ) -> Tuple[int, Mapping[str, str], bytes]:
+        started = time.perf_counter()
+        async with self.session.request(method, url, params=params, json=json_body, headers=headers) as response:
+            body = await response.read() if response.status != 304 else b""
+            if response.status < 500:
+                self._policy.observe(template, time.perf_counter() - started)
+            return response.status, response.headers, body
+
+    async def _hedged(
+        self, template: str, url: str, params: Optional[Dict[str, Any]], headers: Dict[str, str],
+    ) -> Tuple[int, Mapping[str, str], bytes]:
+        """
+        GET с дублем: если ответа нет дольше p95 эндпоинта, тот же запрос
+        уходит ещё раз, и берётся первый успешный ответ. Ошибка или 5xx
+        одного запроса не отменяет другой: 5xx возвращается, только если
+        лучшего ответа так и не пришло.
+        """
+        delay = self._policy.hedge_delay(template)
+        if delay is None:
+            return await self._send(template, "GET", url, params, None, headers)
+        tasks = [asyncio.create_task(self._send(template, "GET", url, params, None, headers))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and self._policy.take_hedge():
+                self.hedges += 1
+                if REGISTRY.enabled:
+                    BACKEND_HEDGES.labels(template, "sent").inc()
+                tasks.append(asyncio.create_task(self._send(template, "GET", url, params, None, headers)))
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            failed: Optional[Tuple[int, Mapping[str, str], bytes]] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    if task.result()[0] >= 500:
+                        failed = task.result()
+                        continue
+                    if task is not tasks[0]:
+                        self.hedge_wins += 1
+                        if REGISTRY.enabled:
+                            BACKEND_HEDGES.labels(template, "won").inc()
+                    return task.result()
+            if failed is not None:
+                return failed
+            raise error
+        finally:
+            # Проигравший запрос больше не нужен
+            for task in tasks:
+                task.cancel()
+
+    def _failure(self, breaker: CircuitBreaker, method: str, template: str) -> None:
+        if breaker.failure():
+            logger.warning(
+                "Предохранитель %s %s разомкнут на %s с после %d ошибок подряд",
+                method, template, breaker.open_seconds, breaker.failures,
+            )
+            if REGISTRY.enabled:
+                BACKEND_BREAKER.labels(template, "opened").inc()
+
+    def _reject(self, method: str, template: str, validated: Optional[_Validated]) -> ApiResponse:
+        if validated is not None:
+            self.stale += 1
+            if REGISTRY.enabled:
+                BACKEND_BREAKER.labels(template, "stale").inc()
+            return replace(validated.response, stale=True)
+        self.rejected += 1
+        if REGISTRY.enabled:
+            BACKEND_BREAKER.labels(template, "rejected").inc()
+        raise CircuitOpenError(f"Предохранитель {method} {template} разомкнут")
+
+    def _remember(self, key: Hashable, status: int, headers: Mapping[str, str], result: ApiResponse) -> None:
+        if status == 200:
+            self._validators[key] = _Validated(headers.get("ETag"), headers.get("Last-Modified"), result)
+        elif status < 500:
+            # Данных больше нет или запрос стал некорректным: старое тело не годится
+            self._validators.pop(key, None)
+
+    async def get(self, path: str, *, params: Optional[Dict[str, Any]] = None, **kwargs) -> ApiResponse:
+        """
+        GET-запрос; одинаковые одновременные запросы выполняются один раз.
+        """
+        # Запрос без устаревших данных не должен получить чужой ответ с stale=True
+        key = ("GET", _validator_key(path, params), kwargs.get("allow_stale", True))
+        return await self._flights.do(key, lambda: self.request("GET", path, params=params, **kwargs))
+
+    async def post(self, path: str, **kwargs) -> ApiResponse:
+        return await self.request("POST", path, **kwargs)
+
+    def pool_usage(self) -> Tuple[int, int]:
+        """
+        Число занятых и свободных соединений пула.
+        """
+        connector = self._session.connector if self._session is not None else None
+        acquired = getattr(connector, "_acquired", ())
+        idle = getattr(connector, "_conns", {})
+        return len(acquired), sum(len(conns) for conns in idle.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Статистика пула соединений, запросов, объединённых вызовов и предохранителей.
+        """
+        acquired, idle = self.pool_usage()
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "pool_limit": self._server.limit,
+            "pool_limit_per_host": self._server.limit_per_host,
+            "pool_acquired": acquired,
+            "pool_idle": idle,
+            "coalesced": self._flights.coalesced,
+            "conditional": self.conditional,
+            "not_modified": self.not_modified,
+            "bytes_received": self.bytes_received,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "breaker_rejected": self.rejected,
+            "breaker_stale": self.stale,
+            "breakers_open": self._policy.stats(),
+        }
+
+
+def endpoint(path: str) -> str:
+    """
+    Шаблон пути для метрик: `/users/42` → `/users/{id}`.
+    """
+    return _ID_SEGMENT.sub("/{id}", path)
+
+
+def _validator_key(path: str, params: Optional[Dict[str, Any]]) -> Hashable:
+    return path, tuple(sorted((params or {}).items()))
+
+
+def _decode(body: bytes) -> Dict[str, Any]:
+    """
+    Декодировать тело один раз: JSON независимо от Content-Type, иначе текст.
+    """
+    text = body.decode("utf-8", errors="replace")
+    if not body:
+        return {"text": text}
+    try:
+        return {"data": json.loads(text), "text": text}
+    except json.JSONDecodeError:
+        return {"text": text}
@@ -0,0 +1,151 @@
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+import aiohttp
+
+from core.config_data.config import Resilience
+
+
+class CircuitOpenError(aiohttp.ClientError):
+    """
+    Предохранитель эндпоинта разомкнут: запрос не отправлялся.
+
+    Наследует `aiohttp.ClientError`, поэтому обрабатывается там же,
+    где и сетевые ошибки.
+    """
+
+
+class LatencyWindow:
+    """
+    Время последних успешных запросов к эндпоинту для оценки p95.
+    """
+
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int) -> Optional[float]:
+        if len(self._samples) < min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class CircuitBreaker:
+    """
+    Предохранитель эндпоинта.
+
+    После `failures` ошибок подряд (сеть, таймаут, 5xx) размыкается на
+    `open_seconds`: запросы не отправляются. Затем пропускает один
+    пробный запрос; успех замыкает предохранитель, ошибка — размыкает снова.
+    """
+
+    def __init__(self, failures: int, open_seconds: float):
+        self.threshold = failures
+        self.open_seconds = open_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.probing or time.monotonic() - self.opened_at >= self.open_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self.probing or time.monotonic() - self.opened_at < self.open_seconds:
+            return False
+        self.probing = True
+        return True
+
+    def success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def release(self) -> None:
+        """
+        Пробный запрос завершился без исхода: следующий запрос снова станет пробным.
+        """
+        self.probing = False
+
+    def failure(self) -> bool:
+        """
+        Учесть ошибку; `True`, если предохранитель только что разомкнулся.
+        """
+        self.failures += 1
+        if self.probing or (self.opened_at is None and self.failures >= self.threshold):
+            self.opened_at = time.monotonic()
+            self.probing = False
+            self.opened += 1
+            return True
+        return False
+
+
+class ResiliencePolicy:
+    """
+    Дедлайны, задержка дублирующих запросов и предохранители по эндпоинтам.
+
+    Дубли ограничены бюджетом: каждый GET-запрос добавляет `hedge_ratio`
+    жетона (не больше 10 в запасе), дубль тратит один. Так дубли не
+    умножают нагрузку на и без того медленный бэкенд.
+    """
+
+    def __init__(self, settings: Resilience):
+        self.settings = settings
+        self._deadlines = dict(settings.deadlines)
+        self._windows: Dict[str, LatencyWindow] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._hedge_tokens = 0.0
+
+    def deadline(self, template: str) -> float:
+        return self._deadlines.get(template, self.settings.default_deadline)
+
+    def breaker(self, template: str) -> CircuitBreaker:
+        breaker = self._breakers.get(template)
+        if breaker is None:
+            breaker = self._breakers[template] = CircuitBreaker(
+                self.settings.breaker_failures, self.settings.breaker_open_seconds,
+            )
+        return breaker
+
+    def observe(self, template: str, seconds: float) -> None:
+        window = self._windows.get(template)
+        if window is None:
+            window = self._windows[template] = LatencyWindow()
+        window.add(seconds)
+
+    def hedge_delay(self, template: str) -> Optional[float]:
+        """
+        Через сколько секунд отправить дубль GET-запроса (`None` — не отправлять).
+
+        Вызывается один раз на запрос и пополняет бюджет дублей.
+        """
+        if not self.settings.hedge_enabled:
+            return None
+        self._hedge_tokens = min(10.0, self._hedge_tokens + self.settings.hedge_ratio)
+        window = self._windows.get(template)
+        p95 = window.quantile(0.95, self.settings.hedge_min_samples) if window is not None else None
+        if p95 is None:
+            return None
+        return max(p95, self.settings.hedge_min_delay)
+
+    def take_hedge(self) -> bool:
+        if self._hedge_tokens < 1.0:
+            return False
+        self._hedge_tokens -= 1.0
+        return True
+
+    def stats(self) -> Dict[str, str]:
+        return {
+            template: breaker.state for template, breaker in self._breakers.items() if breaker.state != "closed"
+        }
@@ -0,0 +1,80 @@
+import itertools
+import logging
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_versions = itertools.count(1)
+
+
+class CatalogItem:
+    """
+    Запись каталога (услуга или специалист).
+
+    `duration` — длительность услуги в минутах, если бэкенд её передаёт.
+    """
+    __slots__ = ("id", "name", "duration")
+
+    def __init__(self, id: int, name: str, duration: Optional[int] = None):
+        self.id = id
+        self.name = name
+        self.duration = duration
+
+    def __repr__(self) -> str:
+        return f"CatalogItem(id={self.id!r}, name={self.name!r})"
+
+
+class Catalog:
+    """
+    Неизменяемый список записей каталога с индексом по ID.
+
+    Один экземпляр на процесс разделяется всеми пользователями;
+    в FSM хранятся только выбранные ID. Каждая загрузка получает
+    новую `version`.
+    """
+    __slots__ = ("items", "by_id", "version")
+
+    def __init__(self, items: Tuple[CatalogItem, ...]):
+        self.items = items
+        self.by_id: Dict[int, CatalogItem] = {item.id: item for item in items}
+        self.version = next(_versions)
+
+    @classmethod
+    def from_payload(cls, payload: Iterable[Dict[str, Any]]) -> "Catalog":
+        items = []
+        for raw in payload:
+            try:
+                duration = raw.get("duration")
+                items.append(CatalogItem(
+                    int(raw["id"]), raw["name"], int(duration) if duration is not None else None,
+                ))
+            except (KeyError, TypeError, ValueError):
+                logger.warning("Пропущена некорректная запись каталога: %r", raw)
+        return cls(tuple(items))
+
+    def get(self, item_id: int) -> Optional[CatalogItem]:
+        return self.by_id.get(item_id)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+class CatalogBuilder:
+    """
+    Строит каталог из ответа API и возвращает прежний экземпляр, если
+    ответ — тот же объект (304 на условный запрос). Так неизменившийся
+    каталог сохраняет `version`, и зависящие от неё кэши остаются годными.
+    """
+
+    def __init__(self):
+        self._payload: Any = None
+        self._catalog: Optional[Catalog] = None
+
+    def build(self, payload: Iterable[Dict[str, Any]]) -> Catalog:
+        if payload is not self._payload or self._catalog is None:
+            self._catalog = Catalog.from_payload(payload)
+            self._payload = payload
+        return self._catalog
+
+
+EMPTY_CATALOG = Catalog(())
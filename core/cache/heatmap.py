@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from datetime import date
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from cachetools import TTLCache
+
+from core.config_data.config import Heatmap
+
+logger = logging.getLogger(__name__)
+
+# (ID специалиста, ID услуги, день)
+DayKey = Tuple[int, int, date]
+
+
+class MonthHeat:
+    """
+    Число свободных слотов по дням месяца; `version` меняется вместе с содержимым.
+    """
+    __slots__ = ("counts", "version")
+
+    def __init__(self, counts: Dict[date, int]):
+        self.counts = counts
+        self.version = hash(tuple(sorted(counts.items())))
+
+    def get(self, day: date) -> Optional[int]:
+        return self.counts.get(day)
+
+
+class AvailabilityHeatmap:
+    """
+    Кэш числа свободных слотов по ключу (специалист, услуга, день).
+
+    Для видимого месяца недостающие дни загружаются параллельно, не больше
+    `concurrency` загрузок одновременно на весь процесс. Рендер ждёт их
+    не дольше `budget` секунд; не успевшие загрузки продолжаются в фоне
+    и попадут в следующий рендер. Записи живут `ttl` секунд; при изменении
+    записей на день достаточно сбросить только этот день (`invalidate`).
+    """
+
+    def __init__(self, settings: Heatmap):
+        self.settings = settings
+        self._counts: TTLCache = TTLCache(maxsize=100000, ttl=settings.ttl)
+        self._loading: Dict[DayKey, asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._semaphore = asyncio.Semaphore(settings.concurrency)
+        self.hits = 0
+        self.loads = 0
+        self.failures = 0
+
+    async def month(
+        self,
+        specialist_id: int,
+        service_id: int,
+        days: Iterable[date],
+        count: Callable[[date], Awaitable[Optional[int]]],
+    ) -> MonthHeat:
+        """
+        Тепловая карта по `days` (рабочие дни видимого месяца).
+
+        :param count: число свободных слотов на день или `None`, если узнать не удалось.
+        """
+        days = list(days)
+        waiting = []
+        for day in days:
+            key = (specialist_id, service_id, day)
+            if key in self._counts:
+                self.hits += 1
+                continue
+            task = self._loading.get(key)
+            if task is None:
+                task = self._start(key, count)
+            waiting.append(task)
+
+        if waiting:
+            await asyncio.wait(waiting, timeout=self.settings.budget)
+        return MonthHeat({
+            day: self._counts[key]
+            for day in days
+            if (key := (specialist_id, service_id, day)) in self._counts
+        })
+
+    def _start(self, key: DayKey, count: Callable[[date], Awaitable[Optional[int]]]) -> asyncio.Task:
+        task = asyncio.create_task(self._load(key, count))
+        self._loading[key] = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _load(self, key: DayKey, count: Callable[[date], Awaitable[Optional[int]]]) -> None:
+        task = asyncio.current_task()
+        try:
+            async with self._semaphore:
+                self.loads += 1
+                value = await count(key[2])
+            # Сброс во время загрузки убирает задачу из `_loading`: её результат уже устарел
+            if value is not None and self._loading.get(key) is task:
+                self._counts[key] = value
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            self.failures += 1
+            logger.exception("Не удалось загрузить свободное время для %r", key)
+        finally:
+            if self._loading.get(key) is task:
+                del self._loading[key]
+
+    def peek(self, specialist_id: int, service_id: int, day: date) -> Optional[int]:
+        return self._counts.get((specialist_id, service_id, day))
+
+    def invalidate(self, specialist_id: Optional[int] = None, day: Optional[date] = None) -> None:
+        """
+        Сбросить дни специалиста (или всех): один день или все, для всех услуг.
+        """
+        for entries in (self._counts, self._loading):
+            for key in list(entries.keys()):
+                if (specialist_id is None or key[0] == specialist_id) and (day is None or key[2] == day):
+                    entries.pop(key, None)
+
+    async def close(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "days": len(self._counts),
+            "loading": len(self._loading),
+            "hits": self.hits,
+            "loads": self.loads,
+            "failures": self.failures,
+        }
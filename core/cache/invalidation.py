@@ -0,0 +1,147 @@
+import logging
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from core.cache.catalog import Catalog
+from core.cache.heatmap import AvailabilityHeatmap
+from core.cache.nearest import NearestSlots
+from core.cache.schedule import ScheduleIndex
+from core.cache.slots import SlotEngine
+from core.cache.swr import SWRCache
+
+logger = logging.getLogger(__name__)
+
+CATALOG_KEYS = ("services", "specialists")
+
+
+class InvalidEvent(ValueError):
+    pass
+
+
+class Invalidator:
+    """
+    Применяет уведомления бэкенда об изменениях к кэшам процесса.
+
+    Уведомление — JSON-объект с полем `type`:
+
+    - `services`, `specialists` — изменился каталог; с полем `data`
+      (список как в ответе API) запись заменяется без запроса к API;
+    - `schedule` + `specialist_id` — изменилось расписание специалиста;
+      с полем `entries` оно подставляется сразу;
+    - `bookings` + `specialist_id` (и необязательно `date`) — изменились
+      записи специалиста;
+    - `all` — сбросить всё.
+
+    Зависящие от данных кэши (свободное время, тепловая карта,
+    ближайшие слоты) сбрасываются только в затронутой части.
+    """
+
+    def __init__(
+        self,
+        catalog: SWRCache,
+        schedules: ScheduleIndex,
+        slots: SlotEngine,
+        heatmap: AvailabilityHeatmap,
+        nearest: NearestSlots,
+    ):
+        self.catalog = catalog
+        self.schedules = schedules
+        self.slots = slots
+        self.heatmap = heatmap
+        self.nearest = nearest
+        self.applied = 0
+        self.patched = 0
+        self.rejected = 0
+
+    def apply(self, event: Dict[str, Any]) -> None:
+        """
+        Применить одно уведомление; некорректное — `InvalidEvent`.
+        """
+        try:
+            self._apply(event)
+        except InvalidEvent:
+            self.rejected += 1
+            raise
+        self.applied += 1
+
+    def _apply(self, event: Dict[str, Any]) -> None:
+        if not isinstance(event, dict):
+            raise InvalidEvent(f"Уведомление должно быть объектом: {event!r}")
+        kind = event.get("type")
+        if kind in CATALOG_KEYS:
+            data = event.get("data")
+            if data is not None:
+                if not isinstance(data, list):
+                    raise InvalidEvent(f"Поле data должно быть списком: {event!r}")
+                self.replace_catalog(kind, Catalog.from_payload(data))
+                self.patched += 1
+            else:
+                self.catalog.invalidate(kind)
+                self.nearest.invalidate()
+        elif kind == "schedule":
+            specialist_id = _specialist_id(event)
+            entries = event.get("entries")
+            if entries is not None:
+                if not isinstance(entries, list):
+                    raise InvalidEvent(f"Поле entries должно быть списком: {event!r}")
+                self.replace_schedule(specialist_id, entries)
+                self.patched += 1
+            else:
+                self.schedules.invalidate(specialist_id)
+                self.heatmap.invalidate(specialist_id)
+                self.nearest.invalidate()
+        elif kind == "bookings":
+            specialist_id = _specialist_id(event)
+            self.slots.invalidate(specialist_id)
+            self.heatmap.invalidate(specialist_id, _date(event))
+            self.nearest.invalidate()
+        elif kind == "all":
+            self.invalidate_all()
+        else:
+            raise InvalidEvent(f"Неизвестный тип уведомления: {event!r}")
+        logger.debug("Применено уведомление об изменении: %s", event)
+
+    def replace_catalog(self, key: str, catalog: Catalog) -> None:
+        # Сброс отменяет фоновое обновление, которое могло принести старые данные
+        self.catalog.invalidate(key)
+        self.catalog.set(key, catalog)
+        self.nearest.invalidate()
+
+    def replace_schedule(self, specialist_id: int, entries: List[Dict[str, Any]]) -> bool:
+        """
+        Подставить расписание; зависящие кэши сбрасываются, только если оно изменилось.
+        """
+        before = self.schedules.peek(specialist_id)
+        changed = self.schedules.put(specialist_id, entries) is not before
+        if changed:
+            self.heatmap.invalidate(specialist_id)
+            self.nearest.invalidate()
+        return changed
+
+    def invalidate_all(self) -> None:
+        for key in CATALOG_KEYS:
+            self.catalog.invalidate(key)
+        self.schedules.invalidate()
+        self.slots.invalidate()
+        self.heatmap.invalidate()
+        self.nearest.invalidate()
+
+    def stats(self) -> Dict[str, int]:
+        return {"applied": self.applied, "patched": self.patched, "rejected": self.rejected}
+
+
+def _specialist_id(event: Dict[str, Any]) -> int:
+    try:
+        return int(event["specialist_id"])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidEvent(f"Нет корректного specialist_id: {event!r}") from None
+
+
+def _date(event: Dict[str, Any]) -> Optional[date]:
+    value = event.get("date")
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise InvalidEvent(f"Некорректная дата: {event!r}") from None
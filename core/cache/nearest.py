@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from cachetools import TTLCache
+
+from core.config_data.config import FastBooking
+
+logger = logging.getLogger(__name__)
+
+# (дата, время «ЧЧ:ММ», ID специалиста)
+Slot = Tuple[date, str, int]
+
+
+class NearestSlots:
+    """
+    Поиск ближайшего свободного времени услуги у любого специалиста.
+
+    Сначала параллельно загружаются расписания, затем дни перебираются
+    по возрастанию: для каждого дня свободное время всех работающих
+    специалистов запрашивается параллельно, не больше `concurrency`
+    запросов сразу. Как только найдено `top_k` слотов, более поздние дни
+    не проверяются. Весь поиск укладывается в `budget` секунд: по его
+    истечении возвращается найденное к этому моменту. Полные результаты
+    кэшируются на `cache_ttl` секунд.
+    """
+
+    def __init__(self, settings: FastBooking):
+        self.settings = settings
+        self._results: TTLCache = TTLCache(maxsize=1024, ttl=settings.cache_ttl)
+        self.searches = 0
+        self.cache_hits = 0
+        self.timeouts = 0
+        self.days_checked = 0
+
+    async def find(
+        self,
+        service_id: int,
+        specialist_ids: Iterable[int],
+        work_days: Callable[[int], Awaitable[Iterable[date]]],
+        free_times: Callable[[int, date], Awaitable[List[str]]],
+    ) -> List[Slot]:
+        """
+        :param work_days: рабочие дни специалиста в пределах горизонта поиска.
+        :param free_times: свободное время специалиста на дату.
+        """
+        cached = self._results.get(service_id)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached
+
+        self.searches += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.settings.budget
+        semaphore = asyncio.Semaphore(self.settings.concurrency)
+
+        async def bounded(coro_fn, *args):
+            async with semaphore:
+                return await coro_fn(*args)
+
+        specialist_ids = list(specialist_ids)
+        days_by_specialist, complete = await self._gather(
+            {sid: bounded(work_days, sid) for sid in specialist_ids}, deadline,
+        )
+
+        by_day: Dict[date, Set[int]] = {}
+        for sid, days in days_by_specialist.items():
+            for day in days:
+                by_day.setdefault(day, set()).add(sid)
+
+        found: List[Slot] = []
+        for day in sorted(by_day):
+            if not complete:
+                break
+            self.days_checked += 1
+            times, complete = await self._gather(
+                {sid: bounded(free_times, sid, day) for sid in sorted(by_day[day])}, deadline,
+            )
+            found.extend((day, time, sid) for sid, day_times in times.items() for time in day_times)
+            if len(found) >= self.settings.top_k:
+                break
+
+        result = sorted(found)[:self.settings.top_k]
+        if complete:
+            self._results[service_id] = result
+        return result
+
+    async def _gather(self, coros: Dict[int, Awaitable], deadline: float) -> Tuple[Dict[int, Any], bool]:
+        """
+        Выполнить запросы параллельно до `deadline`.
+
+        Возвращает результаты успешных запросов и признак, что все запросы
+        успели завершиться; не успевшие к `deadline` отменяются.
+        """
+        if not coros:
+            return {}, True
+        tasks = {asyncio.ensure_future(coro): key for key, coro in coros.items()}
+        timeout = deadline - asyncio.get_running_loop().time()
+        done, pending = await asyncio.wait(tasks, timeout=max(0.0, timeout))
+        for task in pending:
+            task.cancel()
+        if pending:
+            self.timeouts += 1
+            logger.warning("Поиск ближайшего времени не уложился в %.1f с", self.settings.budget)
+
+        results = {}
+        for task in done:
+            if task.exception() is not None:
+                logger.error("Ошибка при поиске свободного времени: %r", task.exception())
+                continue
+            results[tasks[task]] = task.result()
+        return results, not pending
+
+    def invalidate(self, service_id: Optional[int] = None) -> None:
+        if service_id is None:
+            self._results.clear()
+        else:
+            self._results.pop(service_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "searches": self.searches,
+            "cache_hits": self.cache_hits,
+            "timeouts": self.timeouts,
+            "days_checked": self.days_checked,
+        }
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from core.config_data.config import Prefetch
+from core.metrics import PREFETCH_RESULTS, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+class _Job:
+    __slots__ = ("key", "task", "started_at", "finished_at", "taken")
+
+    def __init__(self, key: Hashable, task: asyncio.Task):
+        self.key = key
+        self.task = task
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.taken = False
+        task.add_done_callback(self._finished)
+
+    def _finished(self, task: asyncio.Task) -> None:
+        self.finished_at = time.monotonic()
+
+
+class Prefetcher:
+    """
+    Упреждающая загрузка данных следующего шага диалога.
+
+    При выборе в окне (специалист, дата) обработчик запускает загрузку
+    данных следующего окна в фоне; геттер окна забирает готовый результат
+    через `take` (в том числе при повторных рендерах, пока результат не
+    старше `ttl`). У пользователя одна упреждающая загрузка: новая
+    отменяет предыдущую, «Назад» и закрытие диалога отменяют текущую.
+    Загрузчики сами пишут в общие кэши (индекс расписаний, записи), так
+    что результат пригодится и без `take`.
+
+    Метрики: `hits` — результат был готов, `inflight_hits` — загрузка ещё
+    шла и геттер дождался её, `misses` — загрузки не было, `wasted` —
+    результат не понадобился.
+    """
+
+    def __init__(self, settings: Prefetch):
+        self.settings = settings
+        # По порядку запуска: устаревшие загрузки всегда в начале
+        self._jobs: "OrderedDict[int, _Job]" = OrderedDict()
+        self.started = 0
+        self.hits = 0
+        self.inflight_hits = 0
+        self.misses = 0
+        self.cancelled = 0
+        self.wasted = 0
+        self.saved = 0.0
+
+    def start(self, user_id: int, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> None:
+        if not self.settings.enabled:
+            return
+        self.cancel(user_id)
+        self._expire()
+        task = asyncio.create_task(loader())
+        task.add_done_callback(_log_failure)
+        self._jobs[user_id] = _Job(key, task)
+        self.started += 1
+
+    async def take(self, user_id: int, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Результат упреждающей загрузки `key` или обычная загрузка через `loader`.
+        """
+        job = self._find(user_id, key)
+        if job is None:
+            self.misses += 1
+            if REGISTRY.enabled:
+                PREFETCH_RESULTS.labels("miss").inc()
+            return await loader()
+
+        if job.task.done():
+            self.hits += 1
+            if REGISTRY.enabled:
+                PREFETCH_RESULTS.labels("hit").inc()
+            if not job.taken:
+                # Время загрузки, которое пользователь не ждал; колбэк
+                # завершения мог ещё не отработать
+                self.saved += (job.finished_at or time.monotonic()) - job.started_at
+        else:
+            self.inflight_hits += 1
+            if REGISTRY.enabled:
+                PREFETCH_RESULTS.labels("inflight_hit").inc()
+            self.saved += time.monotonic() - job.started_at
+        job.taken = True
+        try:
+            return await job.task
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Ошибка фоновой загрузки: пробуем обычным путём
+            return await loader()
+
+    def cancel(self, user_id: int) -> None:
+        job = self._jobs.pop(user_id, None)
+        if job is None:
+            return
+        if job.task.done():
+            if not job.taken:
+                self.wasted += 1
+                if REGISTRY.enabled:
+                    PREFETCH_RESULTS.labels("wasted").inc()
+        else:
+            job.task.cancel()
+            self.cancelled += 1
+            if REGISTRY.enabled:
+                PREFETCH_RESULTS.labels("cancelled").inc()
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        while self._jobs:
+            user_id, job = next(iter(self._jobs.items()))
+            if now - job.started_at <= self.settings.ttl:
+                break
+            self.cancel(user_id)
+
+    def _find(self, user_id: int, key: Hashable) -> Optional[_Job]:
+        job = self._jobs.get(user_id)
+        if job is None or job.key != key:
+            return None
+        if time.monotonic() - job.started_at > self.settings.ttl:
+            self.cancel(user_id)
+            return None
+        return job
+
+    async def close(self) -> None:
+        tasks = [job.task for job in self._jobs.values()]
+        self._jobs.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        taken = self.hits + self.inflight_hits
+        return {
+            "pending": len(self._jobs),
+            "started": self.started,
+            "hits": self.hits,
+            "inflight_hits": self.inflight_hits,
+            "misses": self.misses,
+            "hit_ratio": taken / (taken + self.misses) if taken + self.misses else 0.0,
+            "cancelled": self.cancelled,
+            "wasted": self.wasted,
+            "saved_seconds": round(self.saved, 3),
+        }
+
+
+def _log_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Упреждающая загрузка завершилась ошибкой: %r", task.exception())
+
+
+def schedule_key(specialist_id: int) -> Hashable:
+    return "schedule", specialist_id
+
+
+def times_key(service_id: int, specialist_id: int, day) -> Hashable:
+    return "times", service_id, specialist_id, day
@@ -0,0 +1,140 @@
+import itertools
+import logging
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.cache.swr import SWRCache
+
+logger = logging.getLogger(__name__)
+
+_versions = itertools.count(1)
+
+
+def parse_minute(value: Any) -> Optional[int]:
+    """
+    Время «ЧЧ:ММ» или «ЧЧ:ММ:СС» в минутах от полуночи (или `None`).
+    """
+    try:
+        hours, minutes = str(value).split(":")[:2]
+        result = int(hours) * 60 + int(minutes)
+    except (TypeError, ValueError):
+        return None
+    return result if 0 <= result <= 24 * 60 else None
+
+
+class SpecialistSchedule:
+    """
+    Расписание специалиста, разложенное по месяцам.
+
+    Для каждого месяца хранится битовая маска рабочих дней: бит `d`
+    выставлен, если `d`-е число рабочее. Проверка дня — O(1) без
+    разбора строк. Если в записях есть `start_time`/`end_time`,
+    рабочие интервалы дня сохраняются в `hours` (минуты от полуночи).
+    """
+    __slots__ = ("months", "hours", "version")
+
+    def __init__(
+        self,
+        months: Dict[Tuple[int, int], int],
+        version: int,
+        hours: Optional[Dict[date, Tuple[Tuple[int, int], ...]]] = None,
+    ):
+        self.months = months
+        self.hours = hours or {}
+        self.version = version
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Dict[str, Any]], version: int = 0) -> "SpecialistSchedule":
+        months: Dict[Tuple[int, int], int] = {}
+        hours: Dict[date, Tuple[Tuple[int, int], ...]] = {}
+        for entry in entries:
+            try:
+                day = date.fromisoformat(entry["date"])
+            except (KeyError, TypeError, ValueError):
+                logger.warning("Пропущена запись расписания без корректной даты: %r", entry)
+                continue
+            key = (day.year, day.month)
+            months[key] = months.get(key, 0) | (1 << day.day)
+            start, end = parse_minute(entry.get("start_time")), parse_minute(entry.get("end_time"))
+            if start is not None and end is not None and start < end:
+                hours[day] = hours.get(day, ()) + ((start, end),)
+        return cls(months, version, hours)
+
+    def month_mask(self, year: int, month: int) -> int:
+        return self.months.get((year, month), 0)
+
+    def is_work_day(self, day: date, today: Optional[date] = None) -> bool:
+        """
+        Рабочий ли день `day`; прошедшие дни рабочими не считаются.
+        """
+        if day < (today or date.today()):
+            return False
+        return bool(self.month_mask(day.year, day.month) >> day.day & 1)
+
+    def work_hours(self, day: date) -> Optional[Tuple[Tuple[int, int], ...]]:
+        """
+        Рабочие интервалы дня или `None`, если часы работы неизвестны.
+        """
+        return self.hours.get(day)
+
+    def work_days(self, year: int, month: int) -> List[date]:
+        mask = self.month_mask(year, month)
+        return [date(year, month, d) for d in range(1, 32) if mask >> d & 1]
+
+
+class ScheduleIndex:
+    """
+    Индекс расписаний специалистов поверх `SWRCache`.
+
+    Расписание загружается один раз и обновляется в фоне по истечении TTL;
+    навигация по месяцам календаря обращается только к индексу.
+    Версия расписания меняется лишь при реальном изменении рабочих дней.
+    """
+
+    def __init__(self, ttl: float):
+        self._cache = SWRCache(ttl)
+
+    async def get(
+        self, specialist_id: int, fetch: Callable[[], Awaitable[Optional[List[Dict[str, Any]]]]],
+    ) -> SpecialistSchedule:
+        async def load() -> Optional[SpecialistSchedule]:
+            entries = await fetch()
+            if entries is None:
+                return None
+            return self._merge(specialist_id, SpecialistSchedule.from_entries(entries))
+
+        schedule = await self._cache.get(specialist_id, load)
+        return schedule if schedule is not None else SpecialistSchedule({}, 0)
+
+    def peek(self, specialist_id: Optional[int]) -> Optional[SpecialistSchedule]:
+        return self._cache.peek(specialist_id)
+
+    def put(self, specialist_id: int, entries: List[Dict[str, Any]]) -> SpecialistSchedule:
+        """
+        Подставить присланное бэкендом расписание без запроса к API.
+        """
+        schedule = self._merge(specialist_id, SpecialistSchedule.from_entries(entries))
+        # Сброс отменяет фоновое обновление, которое могло принести старые данные
+        self._cache.invalidate(specialist_id)
+        self._cache.set(specialist_id, schedule)
+        return schedule
+
+    def invalidate(self, specialist_id: Optional[int] = None) -> None:
+        self._cache.invalidate(specialist_id)
+
+    def specialist_ids(self) -> List[int]:
+        return self._cache.keys()
+
+    def _merge(self, specialist_id: int, fresh: SpecialistSchedule) -> SpecialistSchedule:
+        # Неизменившееся расписание сохраняет объект и версию
+        current = self._cache.peek(specialist_id)
+        if current is not None and current.months == fresh.months and current.hours == fresh.hours:
+            return current
+        fresh.version = next(_versions)
+        return fresh
+
+    async def close(self) -> None:
+        await self._cache.close()
+
+    def stats(self) -> Dict[str, int]:
+        return self._cache.stats()
@@ -0,0 +1,215 @@
+import itertools
+import logging
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from cachetools import LRUCache
+
+from core.cache.schedule import SpecialistSchedule, parse_minute
+from core.cache.swr import SWRCache
+from core.config_data.config import Slots
+
+logger = logging.getLogger(__name__)
+
+DAY_MINUTES = 24 * 60
+
+_versions = itertools.count(1)
+
+
+def span(start: int, end: int) -> int:
+    """
+    Маска минут `[start, end)`.
+    """
+    return ((1 << (end - start)) - 1) << start
+
+
+def fit(free: int, length: int) -> int:
+    """
+    Маска минут `t`, с которых свободны все минуты `[t, t + length)`.
+
+    Вместо `length` сдвигов хватает O(log length): на каждом шаге
+    ширина проверенного окна удваивается.
+    """
+    starts, width = free, 1
+    while width * 2 <= length:
+        starts &= starts >> width
+        width *= 2
+    if width < length:
+        starts &= starts >> (length - width)
+    return starts
+
+
+@lru_cache(maxsize=64)
+def grid(step: int, days: int) -> int:
+    """
+    Маска допустимых начал записи: каждые `step` минут от полуночи, `days` дней подряд.
+    """
+    day = sum(1 << minute for minute in range(0, DAY_MINUTES, step))
+    return sum(day << (i * DAY_MINUTES) for i in range(days))
+
+
+def format_minute(minute: int) -> str:
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+class Bookings:
+    """
+    Занятое время специалиста: маска занятых минут по дням.
+    """
+    __slots__ = ("busy", "version")
+
+    def __init__(self, busy: Dict[date, int], version: int = 0):
+        self.busy = busy
+        self.version = version
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Dict[str, Any]]) -> "Bookings":
+        busy: Dict[date, int] = {}
+        for entry in entries:
+            try:
+                day = date.fromisoformat(entry.get("booking_date") or entry["date"])
+            except (KeyError, TypeError, ValueError):
+                logger.warning("Пропущена запись без корректной даты: %r", entry)
+                continue
+            start = parse_minute(entry.get("booking_time") or entry.get("start_time"))
+            end = parse_minute(entry.get("end_time"))
+            if end is None and start is not None and entry.get("duration") is not None:
+                try:
+                    end = min(start + int(entry["duration"]), DAY_MINUTES)
+                except (TypeError, ValueError):
+                    end = None
+            if start is None or end is None or start >= end:
+                logger.warning("Пропущена запись без корректного времени: %r", entry)
+                continue
+            busy[day] = busy.get(day, 0) | span(start, end)
+        return cls(busy)
+
+
+class SlotEngine:
+    """
+    Локальный расчёт свободного времени записи.
+
+    Рабочие часы берутся из расписания специалиста, занятость — из
+    записей (`Bookings`), длительность — из каталога услуг. Все дни
+    горизонта укладываются в одно целое число по минуте на бит (день —
+    1440 бит), поэтому свободные начала записи на всю неделю дают
+    несколько побитовых операций. Результат запоминается по версиям
+    расписания и записей.
+    """
+
+    def __init__(self, settings: Slots):
+        self.settings = settings
+        self._bookings = SWRCache(settings.bookings_ttl)
+        self._results: LRUCache = LRUCache(maxsize=4096)
+        self._listeners: List[Callable[[int, date], None]] = []
+        self.computed = 0
+        self.reused = 0
+
+    async def bookings(
+        self, specialist_id: int, first_day: date,
+        fetch: Callable[[date, date], Awaitable[Optional[List[Dict[str, Any]]]]],
+    ) -> Optional[Bookings]:
+        """
+        Записи специалиста на горизонт с `first_day`; `None`, если загрузить не удалось.
+        """
+        key = (specialist_id, first_day)
+        last_day = first_day + timedelta(days=self.settings.horizon_days - 1)
+
+        async def load() -> Optional[Bookings]:
+            entries = await fetch(first_day, last_day)
+            if entries is None:
+                return None
+            fresh = Bookings.from_entries(entries)
+            current = self._bookings.peek(key)
+            if current is not None:
+                if current.busy == fresh.busy:
+                    return current
+                self._notify(specialist_id, current, fresh)
+            fresh.version = next(_versions)
+            return fresh
+
+        return await self._bookings.get(key, load)
+
+    def subscribe(self, callback: Callable[[int, date], None]) -> None:
+        """
+        Вызывать `callback(specialist_id, day)` для каждого дня, в котором изменились записи.
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, specialist_id: int, old: Bookings, new: Bookings) -> None:
+        for day in old.busy.keys() | new.busy.keys():
+            if old.busy.get(day) != new.busy.get(day):
+                for callback in self._listeners:
+                    callback(specialist_id, day)
+
+    def invalidate(self, specialist_id: Optional[int] = None) -> None:
+        """
+        Сбросить загруженные записи специалиста (или все), например если слот оказался занят.
+        """
+        if specialist_id is None:
+            self._bookings.invalidate()
+            return
+        for key in [k for k in self._bookings.keys() if k[0] == specialist_id]:
+            self._bookings.invalidate(key)
+
+    def free_slots(
+        self,
+        schedule: SpecialistSchedule,
+        bookings: Bookings,
+        duration: int,
+        first_day: date,
+        now_minute: int = 0,
+    ) -> Optional[Dict[date, Tuple[str, ...]]]:
+        """
+        Свободные начала записи по дням горизонта с `first_day`.
+
+        Минуты до `now_minute` первого дня считаются прошедшими.
+        Возвращает `None`, если для рабочего дня горизонта неизвестны часы
+        работы: тогда время нужно спрашивать у бэкенда.
+        """
+        key = (schedule.version, bookings.version, duration, first_day, now_minute)
+        result = self._results.get(key)
+        if result is not None:
+            self.reused += 1
+            return result
+
+        days = self.settings.horizon_days
+        free = busy = 0
+        for i in range(days):
+            day = first_day + timedelta(days=i)
+            if not schedule.is_work_day(day, today=first_day):
+                continue
+            hours = schedule.work_hours(day)
+            if hours is None:
+                return None
+            offset = i * DAY_MINUTES
+            for start, end in hours:
+                free |= span(start, end) << offset
+            busy |= bookings.busy.get(day, 0) << offset
+
+        free &= ~busy & ~((1 << now_minute) - 1)
+        starts = fit(free, duration) & grid(self.settings.step, days)
+
+        slots: Dict[date, List[str]] = {}
+        while starts:
+            low = starts & -starts
+            position = low.bit_length() - 1
+            starts ^= low
+            day, minute = divmod(position, DAY_MINUTES)
+            slots.setdefault(first_day + timedelta(days=day), []).append(format_minute(minute))
+
+        result = {day: tuple(times) for day, times in slots.items()}
+        self._results[key] = result
+        self.computed += 1
+        return result
+
+    async def close(self) -> None:
+        await self._bookings.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "computed": self.computed,
+            "reused": self.reused,
+            **{f"bookings_{name}": value for name, value in self._bookings.stats().items()},
+        }
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[], Awaitable[Any]]
+
+
+@dataclass
+class _Entry:
+    value: Any
+    loaded_at: float
+
+
+class SWRCache:
+    """
+    Кэш в памяти процесса с TTL и stale-while-revalidate.
+
+    Свежая запись отдаётся сразу; устаревшая тоже отдаётся сразу, а в фоне
+    запускается одно обновление. Ожидание загрузчика бывает только при
+    первом обращении или после `invalidate()`. Результат `None` загрузчика
+    считается ошибкой и не кэшируется. Загрузка, начатая до `invalidate()`,
+    свой результат в кэш не кладёт.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+        self._refreshing: Dict[Hashable, asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        # Поколения записей: растут при каждом сбросе ключа или всего кэша
+        self._generations: Dict[Hashable, int] = {}
+        self._epoch = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    async def get(self, key: Hashable, loader: Loader) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return await self._load(key, loader)
+
+        if time.monotonic() - entry.loaded_at < self.ttl:
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+            self._schedule_refresh(key, loader)
+        return entry.value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """
+        Значение из кэша без обращения к загрузчику (или `None`).
+        """
+        entry = self._entries.get(key)
+        return entry.value if entry is not None else None
+
+    def keys(self) -> List[Hashable]:
+        return list(self._entries)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = _Entry(value, time.monotonic())
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """
+        Сбросить одну запись или весь кэш; следующий `get` загрузит данные заново.
+        """
+        if key is None:
+            self._entries.clear()
+            self._loading.clear()
+            self._epoch += 1
+            refreshing = list(self._refreshing.values())
+        else:
+            self._entries.pop(key, None)
+            self._loading.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+            refreshing = [self._refreshing[key]] if key in self._refreshing else []
+        # Фоновое обновление могло начаться до сброса и вернуть старые данные
+        for task in refreshing:
+            task.cancel()
+
+    async def _load(self, key: Hashable, loader: Loader) -> Any:
+        # Параллельные промахи по одному ключу ждут одну загрузку
+        future = self._loading.get(key)
+        if future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # Отменили того, кто загружал (например, упреждающую загрузку), а не нас
+                return await self._load(key, loader)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        generation = self._generation(key)
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # помечаем исключение как полученное
+            raise
+        else:
+            # Данные могли измениться во время загрузки: тогда в кэш их не кладём
+            if value is not None and self._generation(key) == generation:
+                self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            if self._loading.get(key) is future:
+                del self._loading[key]
+
+    def _generation(self, key: Hashable) -> Tuple[int, int]:
+        return self._epoch, self._generations.get(key, 0)
+
+    def _schedule_refresh(self, key: Hashable, loader: Loader) -> None:
+        if key in self._refreshing:
+            return
+        task = asyncio.create_task(self._refresh(key, loader))
+        self._refreshing[key] = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, key: Hashable, loader: Loader) -> None:
+        self.refreshes += 1
+        generation = self._generation(key)
+        try:
+            value = await loader()
+            if value is not None and self._generation(key) == generation:
+                self.set(key, value)
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            logger.exception("Не удалось обновить запись кэша %r, остаётся устаревшая копия", key)
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def close(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+        }
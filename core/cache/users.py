@@ -0,0 +1,55 @@
+from typing import Any, Dict
+
+from cachetools import TTLCache
+
+# Маркер промаха: в кэше нет сведений о пользователе
+MISS = object()
+
+
+class UserCache:
+    """
+    Ограниченный LRU+TTL кэш зарегистрированных пользователей по tg_id.
+
+    Известные пользователи хранятся `ttl` секунд, ответы 404 —
+    `negative_ttl` секунд, чтобы новый пользователь быстро увидел
+    результат своей регистрации.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, negative_ttl: float):
+        self._known: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._missing: TTLCache = TTLCache(maxsize=maxsize, ttl=negative_ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, tg_id: int) -> Any:
+        """
+        Данные пользователя, `None` для недавнего 404 или `MISS`.
+        """
+        user = self._known.get(tg_id, MISS)
+        if user is MISS and tg_id in self._missing:
+            user = None
+        if user is MISS:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return user
+
+    def remember(self, tg_id: int, user: Any) -> None:
+        self._missing.pop(tg_id, None)
+        self._known[tg_id] = user
+
+    def remember_missing(self, tg_id: int) -> None:
+        self._known.pop(tg_id, None)
+        self._missing[tg_id] = True
+
+    def invalidate(self, tg_id: int) -> None:
+        self._known.pop(tg_id, None)
+        self._missing.pop(tg_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "known": len(self._known),
+            "missing": len(self._missing),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -1,11 +1,17 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Tuple
 
 from environs import Env
 
 @dataclass
 class Server:
     url: str
+    timeout: float = 10.0          # Таймаут одного запроса к API, сек.
+    limit: int = 100               # Максимум соединений в пуле
+    limit_per_host: int = 20       # Максимум соединений к одному хосту
+    dns_ttl: int = 300             # Время жизни DNS-кэша, сек.
+    keepalive: float = 30.0        # Время удержания простаивающего соединения, сек.
+    validators_maxsize: int = 2048  # Сколько GET-ответов хранить для условных запросов и отдачи при сбоях; 0 — отключить
     
 
 @dataclass
@@ -14,10 +20,163 @@ class TgBot:
     
 
 
+@dataclass
+class Cache:
+    catalog_ttl: float = 600.0     # Время жизни каталога услуг и специалистов, сек.
+    schedule_ttl: float = 300.0    # Время жизни расписания специалиста до фонового обновления, сек.
+    users_maxsize: int = 10000     # Максимум пользователей в кэше регистрации
+    users_ttl: float = 3600.0      # Время жизни записи о зарегистрированном пользователе, сек.
+    users_negative_ttl: float = 30.0  # Время жизни записи «пользователь не найден», сек.
+
+
+@dataclass
+class Storage:
+    backend: str = "memory"        # Хранилище FSM: memory, bounded или sqlite
+    path: str = "fsm.sqlite3"      # Файл базы для sqlite
+    flush_interval: float = 1.0    # Период пакетной записи изменений, сек.
+    batch_size: int = 500          # Внеочередная запись при таком числе изменений
+    idle_ttl: float = 3600.0       # bounded: удалять сессии, простаивающие дольше, сек.
+    max_sessions: int = 50000      # bounded: максимум сессий в памяти
+
+
+@dataclass
+class Webhook:
+    enabled: bool = False          # Принимать апдейты вебхуком вместо long polling
+    url: str = ""                  # Публичный адрес бота, например https://bot.example.com
+    path: str = "/webhook"         # Путь вебхука
+    host: str = "0.0.0.0"          # Адрес, на котором слушает веб-сервер
+    port: int = 8081               # Порт веб-сервера
+    secret: str = ""               # Секрет для заголовка X-Telegram-Bot-Api-Secret-Token
+    max_concurrency: int = 100     # Максимум одновременно обрабатываемых апдейтов
+    drain_timeout: float = 10.0    # Сколько ждать принятые апдейты при остановке, сек.
+
+
+@dataclass
+class Workers:
+    count: int = 0                 # Число процессов-воркеров; 0 — всё в одном процессе
+    queue_size: int = 10000        # Максимум апдейтов в очереди одного воркера
+    max_concurrency: int = 100     # Максимум одновременно обрабатываемых апдейтов в воркере
+    stats_interval: float = 60.0   # Период вывода статистики воркеров, сек.
+
+
+@dataclass
+class Scheduler:
+    max_concurrency: int = 50      # Максимум одновременно выполняемых обработчиков
+    queue_size: int = 1000         # Максимум апдейтов, ожидающих обработки
+    overflow: str = "busy"         # При переполнении: drop — отбросить, busy — ответить «бот занят»
+    busy_text: str = "Бот сейчас перегружен, повторите через несколько секунд."
+
+
+@dataclass
+class Slots:
+    step: int = 30                 # Шаг сетки начала записи, мин.
+    horizon_days: int = 7          # На сколько дней вперёд считать свободное время локально
+    bookings_ttl: float = 30.0     # Время жизни загруженных записей специалиста, сек.
+
+
+@dataclass
+class FastBooking:
+    top_k: int = 5                 # Сколько ближайших слотов показывать
+    concurrency: int = 8           # Максимум одновременных запросов при поиске
+    budget: float = 2.0            # Бюджет времени на поиск, сек.
+    cache_ttl: float = 15.0        # Время жизни найденных слотов, сек.
+
+
+@dataclass
+class Heatmap:
+    concurrency: int = 6           # Максимум одновременных загрузок свободного времени по дням
+    budget: float = 0.15           # Сколько рендер календаря ждёт загрузку, сек.
+    ttl: float = 120.0             # Время жизни числа свободных слотов дня, сек.
+
+
+@dataclass
+class Prefetch:
+    enabled: bool = True           # Загружать данные следующего шага диалога заранее
+    ttl: float = 60.0              # Сколько хранить неиспользованный результат, сек.
+
+
+@dataclass
+class Metrics:
+    enabled: bool = False          # Собирать метрики и отдавать их по HTTP
+    host: str = "127.0.0.1"        # Адрес HTTP-сервера метрик
+    port: int = 9101               # Порт сервера метрик; воркер N слушает port + N + 1
+    path: str = "/metrics"         # Путь страницы метрик в формате Prometheus
+
+
+@dataclass
+class Tracing:
+    enabled: bool = False          # Выборочная трассировка апдейтов
+    sample_rate: float = 0.01      # Доля трассируемых апдейтов
+    directory: str = "traces"      # Каталог файлов трассировки (Chrome Trace / Perfetto)
+    updates_per_file: int = 200    # Апдейтов в одном файле
+    flush_interval: float = 60.0   # Записывать накопленное не реже, сек.
+    max_files: int = 50            # Сколько последних файлов хранить
+
+
+@dataclass
+class Logging:
+    level: str = "INFO"            # Уровень логов
+    format: str = "text"           # text или json (одна запись — одна строка JSON)
+    queue_size: int = 10000        # Очередь записей к фоновому потоку; при переполнении запись теряется
+    max_length: int = 2000         # Обрезать сообщения длиннее, символов; 0 — не обрезать
+    debug_sample_rate: float = 1.0  # Доля выводимых записей DEBUG (данные целиком)
+
+
+@dataclass
+class Startup:
+    warmup: bool = True            # Заполнить кэши каталога и расписаний до приёма апдейтов
+    warmup_timeout: float = 10.0   # Сколько ждать прогрев, сек.; потом бот запускается без него
+    warmup_locales: Tuple[str, ...] = ("ru",)  # Локали календаря, загружаемые при прогреве
+
+
+@dataclass
+class Push:
+    http_enabled: bool = False     # Принимать уведомления об изменениях POST-запросом
+    host: str = "127.0.0.1"        # Адрес HTTP-приёмника уведомлений
+    port: int = 8082               # Порт приёмника; воркер N слушает port + N + 1
+    path: str = "/invalidate"      # Путь приёмника
+    secret: str = ""               # Bearer-токен приёмника и подписки; без него приёмник не запускается
+    sse_path: str = ""             # Путь SSE-потока на SERVER_URL, например /events; пусто — не подписываться
+    sse_read_timeout: float = 90.0  # Переподключиться, если поток молчит дольше, сек.
+    reconnect_delay: float = 1.0   # Первая пауза перед переподключением, сек.; дальше удваивается до 30
+    poll_interval: float = 60.0    # Период перезагрузки каталога и расписаний, пока поток недоступен, сек.
+
+
+@dataclass
+class Resilience:
+    default_deadline: float = 5.0  # Дедлайн запроса к API вместе с дублем, сек.
+    deadlines: Tuple[Tuple[str, float], ...] = (  # Дедлайны по шаблонам эндпоинтов, сек.
+        ("/available_times", 3.0),
+        ("/bookings", 3.0),
+        ("/work_schedules/specialist/{id}", 3.0),
+    )
+    hedge_enabled: bool = True     # Дублировать медленные GET-запросы
+    hedge_min_delay: float = 0.05  # Дубль отправляется не раньше, сек.; обычно — через p95 эндпоинта
+    hedge_min_samples: int = 20    # Сколько замеров эндпоинта нужно для оценки p95
+    hedge_ratio: float = 0.1       # Доля GET-запросов, для которых допустим дубль
+    breaker_failures: int = 5      # Ошибок подряд, после которых предохранитель эндпоинта размыкается
+    breaker_open_seconds: float = 10.0  # Сколько предохранитель не пропускает запросы, сек.
+
+
 @dataclass
 class Config:
     tg_bot: TgBot
     server: Server
+    resilience: Resilience
+    cache: Cache
+    storage: Storage
+    webhook: Webhook
+    workers: Workers
+    scheduler: Scheduler
+    slots: Slots
+    fast_booking: FastBooking
+    heatmap: Heatmap
+    prefetch: Prefetch
+    metrics: Metrics
+    tracing: Tracing
+    logging: Logging
+    startup: Startup
+    push: Push
     
 
 
@@ -26,5 +185,118 @@ def load_config(path: Optional[str] = None) -> Config:
     env.read_env(path)
     return Config(
         tg_bot=TgBot(token=env('BOT_TOKEN')),
-        server=Server(url=env('SERVER_URL'))
+        server=Server(
+            url=env('SERVER_URL'),
+            timeout=env.float('SERVER_TIMEOUT', 10.0),
+            limit=env.int('SERVER_POOL_LIMIT', 100),
+            limit_per_host=env.int('SERVER_POOL_LIMIT_PER_HOST', 20),
+            dns_ttl=env.int('SERVER_DNS_TTL', 300),
+            keepalive=env.float('SERVER_KEEPALIVE', 30.0),
+            validators_maxsize=env.int('SERVER_VALIDATORS_MAXSIZE', 2048),
+        ),
+        resilience=Resilience(
+            default_deadline=env.float('BACKEND_DEADLINE', 5.0),
+            deadlines=tuple(env.dict('BACKEND_DEADLINES', {}, subcast_values=float).items())
+                or Resilience.deadlines,
+            hedge_enabled=env.bool('BACKEND_HEDGE_ENABLED', True),
+            hedge_min_delay=env.float('BACKEND_HEDGE_MIN_DELAY', 0.05),
+            hedge_min_samples=env.int('BACKEND_HEDGE_MIN_SAMPLES', 20),
+            hedge_ratio=env.float('BACKEND_HEDGE_RATIO', 0.1),
+            breaker_failures=env.int('BACKEND_BREAKER_FAILURES', 5),
+            breaker_open_seconds=env.float('BACKEND_BREAKER_OPEN_SECONDS', 10.0),
+        ),
+        cache=Cache(
+            catalog_ttl=env.float('CATALOG_TTL', 600.0),
+            schedule_ttl=env.float('SCHEDULE_TTL', 300.0),
+            users_maxsize=env.int('USERS_CACHE_SIZE', 10000),
+            users_ttl=env.float('USERS_CACHE_TTL', 3600.0),
+            users_negative_ttl=env.float('USERS_NEGATIVE_TTL', 30.0),
+        ),
+        storage=Storage(
+            backend=env.str('STORAGE_BACKEND', 'memory'),
+            path=env.str('STORAGE_PATH', 'fsm.sqlite3'),
+            flush_interval=env.float('STORAGE_FLUSH_INTERVAL', 1.0),
+            batch_size=env.int('STORAGE_BATCH_SIZE', 500),
+            idle_ttl=env.float('STORAGE_IDLE_TTL', 3600.0),
+            max_sessions=env.int('STORAGE_MAX_SESSIONS', 50000),
+        ),
+        webhook=Webhook(
+            enabled=env.bool('WEBHOOK_ENABLED', False),
+            url=env.str('WEBHOOK_URL', ''),
+            path=env.str('WEBHOOK_PATH', '/webhook'),
+            host=env.str('WEBHOOK_HOST', '0.0.0.0'),
+            port=env.int('WEBHOOK_PORT', 8081),
+            secret=env.str('WEBHOOK_SECRET', ''),
+            max_concurrency=env.int('WEBHOOK_MAX_CONCURRENCY', 100),
+            drain_timeout=env.float('WEBHOOK_DRAIN_TIMEOUT', 10.0),
+        ),
+        workers=Workers(
+            count=env.int('WORKERS', 0),
+            queue_size=env.int('WORKER_QUEUE_SIZE', 10000),
+            max_concurrency=env.int('WORKER_MAX_CONCURRENCY', 100),
+            stats_interval=env.float('WORKER_STATS_INTERVAL', 60.0),
+        ),
+        scheduler=Scheduler(
+            max_concurrency=env.int('SCHEDULER_MAX_CONCURRENCY', 50),
+            queue_size=env.int('SCHEDULER_QUEUE_SIZE', 1000),
+            overflow=env.str('SCHEDULER_OVERFLOW', 'busy'),
+            busy_text=env.str('SCHEDULER_BUSY_TEXT', Scheduler.busy_text),
+        ),
+        slots=Slots(
+            step=env.int('SLOT_STEP', 30),
+            horizon_days=env.int('SLOT_HORIZON_DAYS', 7),
+            bookings_ttl=env.float('BOOKINGS_TTL', 30.0),
+        ),
+        fast_booking=FastBooking(
+            top_k=env.int('FAST_BOOKING_TOP_K', 5),
+            concurrency=env.int('FAST_BOOKING_CONCURRENCY', 8),
+            budget=env.float('FAST_BOOKING_BUDGET', 2.0),
+            cache_ttl=env.float('FAST_BOOKING_CACHE_TTL', 15.0),
+        ),
+        heatmap=Heatmap(
+            concurrency=env.int('HEATMAP_CONCURRENCY', 6),
+            budget=env.float('HEATMAP_BUDGET', 0.15),
+            ttl=env.float('HEATMAP_TTL', 120.0),
+        ),
+        prefetch=Prefetch(
+            enabled=env.bool('PREFETCH_ENABLED', True),
+            ttl=env.float('PREFETCH_TTL', 60.0),
+        ),
+        metrics=Metrics(
+            enabled=env.bool('METRICS_ENABLED', False),
+            host=env.str('METRICS_HOST', '127.0.0.1'),
+            port=env.int('METRICS_PORT', 9101),
+            path=env.str('METRICS_PATH', '/metrics'),
+        ),
+        tracing=Tracing(
+            enabled=env.bool('TRACING_ENABLED', False),
+            sample_rate=env.float('TRACING_SAMPLE_RATE', 0.01),
+            directory=env.str('TRACING_DIR', 'traces'),
+            updates_per_file=env.int('TRACING_UPDATES_PER_FILE', 200),
+            flush_interval=env.float('TRACING_FLUSH_INTERVAL', 60.0),
+            max_files=env.int('TRACING_MAX_FILES', 50),
+        ),
+        logging=Logging(
+            level=env.str('LOG_LEVEL', 'INFO'),
+            format=env.str('LOG_FORMAT', 'text'),
+            queue_size=env.int('LOG_QUEUE_SIZE', 10000),
+            max_length=env.int('LOG_MAX_LENGTH', 2000),
+            debug_sample_rate=env.float('LOG_DEBUG_SAMPLE_RATE', 1.0),
+        ),
+        startup=Startup(
+            warmup=env.bool('STARTUP_WARMUP', True),
+            warmup_timeout=env.float('STARTUP_WARMUP_TIMEOUT', 10.0),
+            warmup_locales=tuple(env.list('STARTUP_WARMUP_LOCALES', ['ru'])),
+        ),
+        push=Push(
+            http_enabled=env.bool('PUSH_HTTP_ENABLED', False),
+            host=env.str('PUSH_HOST', '127.0.0.1'),
+            port=env.int('PUSH_PORT', 8082),
+            path=env.str('PUSH_PATH', '/invalidate'),
+            secret=env.str('PUSH_SECRET', ''),
+            sse_path=env.str('PUSH_SSE_PATH', ''),
+            sse_read_timeout=env.float('PUSH_SSE_READ_TIMEOUT', 90.0),
+            reconnect_delay=env.float('PUSH_RECONNECT_DELAY', 1.0),
+            poll_interval=env.float('PUSH_POLL_INTERVAL', 60.0),
+        ),
     )
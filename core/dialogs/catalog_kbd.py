@@ -0,0 +1,112 @@
+import operator
+from typing import Dict, List, Optional, Tuple
+
+from aiogram.types import InlineKeyboardButton
+from aiogram_dialog import DialogManager
+from aiogram_dialog.api.internal import RawKeyboard
+from aiogram_dialog.widgets.kbd import Radio, Select
+from aiogram_dialog.widgets.text import Text
+from cachetools import LRUCache
+
+from core.cache.catalog import EMPTY_CATALOG, Catalog
+
+
+_Rendered = Tuple[List[InlineKeyboardButton], Dict[str, Tuple[int, str]]]
+
+
+def _catalog(data: Dict, key: str) -> Catalog:
+    return data.get(key) or EMPTY_CATALOG
+
+
+def _item_data(data: Dict, pos: int, item) -> Dict:
+    return {"data": data, "item": item, "target_item": item, "pos": pos + 1, "pos0": pos}
+
+
+def copy_keyboard(keyboard: RawKeyboard) -> RawKeyboard:
+    """
+    Копия общей клавиатуры для одного рендера.
+
+    aiogram_dialog дописывает intent_id в callback_data кнопок на месте,
+    поэтому закэшированные кнопки нельзя отдавать как есть.
+    """
+    return [[button.model_copy() for button in row] for row in keyboard]
+
+
+class CatalogSelect(Select):
+    """
+    `Select` по записям общего каталога.
+
+    `items` — ключ данных окна, под которым лежит `Catalog`. Текст кнопок
+    одинаков для всех пользователей, поэтому клавиатура строится один раз
+    на версию каталога; шаблон `text` не должен зависеть от данных окна,
+    кроме `item` и `pos`.
+    """
+
+    def __init__(self, text: Text, id: str, items: str, cache_size: int = 4, **kwargs):
+        super().__init__(
+            text=text, id=id, item_id_getter=operator.attrgetter("id"),
+            items=lambda data: _catalog(data, items).items, **kwargs,
+        )
+        self._catalog_key = items
+        self._keyboards: LRUCache = LRUCache(maxsize=cache_size)
+
+    async def _render_keyboard(self, data: Dict, manager: DialogManager) -> RawKeyboard:
+        if manager.is_preview():
+            return await super()._render_keyboard(data, manager)
+        catalog = _catalog(data, self._catalog_key)
+        keyboard = self._keyboards.get(catalog.version)
+        if keyboard is None:
+            keyboard = await super()._render_keyboard(data, manager)
+            self._keyboards[catalog.version] = keyboard
+        return copy_keyboard(keyboard)
+
+
+class CatalogRadio(Radio):
+    """
+    `Radio` по записям общего каталога.
+
+    Оба варианта текста каждой кнопки строятся один раз на версию
+    каталога; для пользователя к общей клавиатуре применяется только
+    отметка выбранной записи. Ограничения на шаблоны — как у `CatalogSelect`.
+    """
+
+    def __init__(self, checked_text: Text, unchecked_text: Text, id: str, items: str, cache_size: int = 4, **kwargs):
+        super().__init__(
+            checked_text=checked_text, unchecked_text=unchecked_text, id=id,
+            item_id_getter=operator.attrgetter("id"),
+            items=lambda data: _catalog(data, items).items, **kwargs,
+        )
+        self._checked_text = checked_text
+        self._unchecked_text = unchecked_text
+        self._catalog_key = items
+        # Версия каталога → (кнопки без отметки, ID записи → позиция и текст с отметкой)
+        self._keyboards: LRUCache = LRUCache(maxsize=cache_size)
+
+    async def _render_keyboard(self, data: Dict, manager: DialogManager) -> RawKeyboard:
+        if manager.is_preview():
+            return await super()._render_keyboard(data, manager)
+        catalog = _catalog(data, self._catalog_key)
+        rendered: Optional[_Rendered] = self._keyboards.get(catalog.version)
+        if rendered is None:
+            rendered = self._keyboards[catalog.version] = await self._render_catalog(catalog, data, manager)
+        buttons, checked_texts = rendered
+        row = copy_keyboard([buttons])[0]
+        checked = checked_texts.get(self._get_checked(manager))
+        if checked is not None:
+            pos, text = checked
+            row[pos] = row[pos].model_copy(update={"text": text})
+        return [row]
+
+    async def _render_catalog(
+        self, catalog: Catalog, data: Dict, manager: DialogManager,
+    ) -> _Rendered:
+        buttons = []
+        checked_texts = {}
+        for pos, item in enumerate(catalog.items):
+            item_data = _item_data(data, pos, item)
+            buttons.append(InlineKeyboardButton(
+                text=await self._unchecked_text.render_text(item_data, manager),
+                callback_data=self._item_callback_data(item.id),
+            ))
+            checked_texts[str(item.id)] = (pos, await self._checked_text.render_text(item_data, manager))
+        return buttons, checked_texts
@@ -1,7 +1,13 @@
 # core/dialogs/service_dialog.py
+import operator
+
+from aiogram import F
 from aiogram_dialog.widgets.kbd import Button
 from datetime import date, datetime
-from typing import Dict
+from functools import lru_cache
+from typing import Dict, Hashable, Optional
+
+from cachetools import LRUCache
 
 from aiogram.enums import ParseMode
 from aiogram_dialog import Dialog, DialogManager, Window
@@ -9,7 +15,7 @@ from aiogram_dialog.widgets.kbd import (
     Calendar,
     CalendarScope, Radio, Column, Row,
 )
-from aiogram_dialog.widgets.kbd import Select, Cancel
+from aiogram_dialog.widgets.kbd import Select, Cancel, SwitchTo
 from aiogram_dialog.widgets.kbd.calendar_kbd import (
     CalendarUserConfig
 )
@@ -20,13 +26,20 @@ from aiogram_dialog.widgets.kbd.calendar_kbd import (
     CalendarMonthView,
     CalendarScopeView,
     CalendarYearsView,
+    get_today,
 )
+from aiogram_dialog.api.internal import RawKeyboard
 from aiogram_dialog.widgets.text import Const, Format, Text
 from aiogram_dialog.widgets.text import Multi
-from babel.dates import get_day_names, get_month_names
 
-from core.handlers.services_handlers.time import times_kbd, available_times_getter
-from core.handlers.services_handlers.calendar import on_date_selected, base_data_getter
+from core.dialogs.catalog_kbd import CatalogSelect, copy_keyboard
+from core.handlers.services_handlers.time import times_kbd, available_times_getter, on_time_confirmed
+from core.handlers.services_handlers.calendar import on_date_selected
+from core.handlers.services_handlers.heatmap import calendar_data_getter
+from core.handlers.services_handlers.nearest import (
+    fast_services_getter, nearest_slots_getter, on_fast_service_selected, on_nearest_selected,
+)
+from core.handlers.services_handlers.prefetch import go_back, on_dialog_close
 from core.handlers.services_handlers.service import services_kbd, service_data_getter
 from core.handlers.services_handlers.specialists import handle_specialist_selected, get_specialists_data
 
@@ -34,74 +47,139 @@ SELECTED_DAYS_KEY = "selected_dates"
 from core.states.ServicesSG import ServicesSG
 
 
+# babel и данные локалей загружаются при первом рендере календаря или при прогреве
+@lru_cache(maxsize=64)
+def day_names(locale: Optional[str]) -> tuple:
+    from babel.dates import get_day_names
+
+    names = get_day_names(width="short", context="stand-alone", locale=locale)
+    return tuple(names[i].title() for i in range(7))
+
+
+@lru_cache(maxsize=64)
+def month_names(locale: Optional[str]) -> tuple:
+    from babel.dates import get_month_names
+
+    names = get_month_names("wide", context="stand-alone", locale=locale)
+    return ("",) + tuple(names[i].title() for i in range(1, 13))
+
+
 class WeekDay(Text):
     async def _render_text(self, data, manager: DialogManager) -> str:
         selected_date: date = data["date"]
         locale = manager.event.from_user.language_code
-        return get_day_names(
-            width="short", context="stand-alone", locale=locale,
-        )[selected_date.weekday()].title()
+        return day_names(locale)[selected_date.weekday()]
 
 
 class MarkedDay(Text):
-    def __init__(self, get_work_days, mark_work: str = "", mark_non_work: str = "⬜️"):
+    def __init__(self, get_schedule, get_heatmap=None, mark_work: str = "", mark_non_work: str = "⬜️",
+                 mark_full: str = "🈵"):
         """
-        :param get_work_days: функция или множество рабочих дней.
+        :param get_schedule: функция, возвращающая расписание специалиста (`SpecialistSchedule`).
+        :param get_heatmap: функция, возвращающая число свободных слотов по дням (`MonthHeat`).
         :param mark_work: эмодзи для рабочих дней.
         :param mark_non_work: эмодзи для нерабочих дней.
+        :param mark_full: эмодзи для рабочих дней без свободного времени.
         """
         super().__init__()
-        self.get_work_days = get_work_days
+        self.get_schedule = get_schedule
+        self.get_heatmap = get_heatmap
         self.mark_work = mark_work
         self.mark_non_work = mark_non_work
+        self.mark_full = mark_full
 
     async def _render_text(self, data, manager: DialogManager) -> str:
         current_date: date = data["date"]
-        serial_date = current_date.isoformat()  # Преобразуем дату в строку "YYYY-MM-DD"
-        work_days = (
-            self.get_work_days(manager)
-            if callable(self.get_work_days)
-            else self.get_work_days
-        )
+        schedule = self.get_schedule(data["data"], manager)
 
         day = current_date.day  # Получаем только день месяца
 
-        if serial_date in work_days:
-            return f"{day}"  # Отображаем только число для рабочего дня
-        return self.mark_non_work  # Показываем эмодзи для нерабочего дня
+        if schedule is None or not schedule.is_work_day(current_date):
+            return self.mark_non_work  # Показываем эмодзи для нерабочего дня
+
+        heat = self.get_heatmap(data["data"], manager) if self.get_heatmap else None
+        free = heat.get(current_date) if heat is not None else None
+        if free is None:
+            return f"{day}"  # Отображаем только число, пока число слотов неизвестно
+        if free == 0:
+            return self.mark_full
+        return f"{day}·{free}"  # Число и количество свободных слотов
 
 
 class Month(Text):
     async def _render_text(self, data, manager: DialogManager) -> str:
         selected_date: date = data["date"]
         locale = manager.event.from_user.language_code
-        return get_month_names(
-            "wide", context="stand-alone", locale=locale,
-        )[selected_date.month].title()
+        return month_names(locale)[selected_date.month]
 
 
 class CustomCalendar(Calendar):
-    def __init__(self, id: str, on_click, work_days):
+    def __init__(self, id: str, on_click, schedule, heatmap=None, cache_size: int = 1024):
         """
         :param id: идентификатор календаря.
         :param on_click: обработчик выбора даты.
-        :param work_days: функция или множество рабочих дней.
+        :param schedule: функция `(data, manager)`, возвращающая расписание специалиста.
+        :param heatmap: функция `(data, manager)`, возвращающая число свободных слотов по дням.
+        :param cache_size: сколько готовых клавиатур держать в памяти.
         """
-        self._work_days = work_days
+        self._schedule = schedule
+        self._heatmap = heatmap
+        # Готовые клавиатуры по (вид, месяц, язык, первый день недели, версии расписания и слотов)
+        self._keyboards: LRUCache = LRUCache(maxsize=cache_size)
+        self._schedule_versions: Dict[int, int] = {}
         super().__init__(id=id, on_click=on_click)
 
-    def _get_work_days(self, manager: DialogManager):
-        # Получаем рабочие дни из `dialog_data`
-        if callable(self._work_days):
-            return self._work_days({}, manager)
-        return self._work_days
+    async def _render_keyboard(self, data, manager: DialogManager) -> RawKeyboard:
+        scope = self.get_scope(manager)
+        offset = self.get_offset(manager)
+        config = self.config.merge(await self._get_user_config(data, manager))
+        if offset is None:
+            offset = get_today(config.timezone)
+            self.set_offset(offset, manager)
+
+        key = self._keyboard_key(scope, offset, config, data, manager)
+        keyboard = self._keyboards.get(key)
+        if keyboard is None:
+            keyboard = await self.views[scope].render(config, offset, data, manager)
+            self._keyboards[key] = keyboard
+        return copy_keyboard(keyboard)
+
+    def _keyboard_key(self, scope: CalendarScope, offset: date, config, data: Dict,
+                      manager: DialogManager) -> Hashable:
+        locale = manager.event.from_user.language_code
+        if scope is CalendarScope.YEARS:
+            return scope, offset.year, config.min_date
+        if scope is CalendarScope.MONTHS:
+            return scope, offset.year, locale, config.min_date
+
+        specialist_id = data.get("specialist_id")
+        schedule = self._schedule(data, manager)
+        version = schedule.version if schedule is not None else 0
+        if self._schedule_versions.get(specialist_id, version) != version:
+            self.invalidate(specialist_id)
+        self._schedule_versions[specialist_id] = version
+        heat = self._heatmap(data, manager) if self._heatmap else None
+        return (
+            scope, offset.year, offset.month, locale, config.firstweekday, config.min_date,
+            specialist_id, version, heat.version if heat is not None else None,
+        )
+
+    def invalidate(self, specialist_id: Optional[int] = None) -> None:
+        """
+        Сбросить готовые клавиатуры дней специалиста (или все).
+        """
+        if specialist_id is None:
+            self._keyboards.clear()
+            return
+        for key in [k for k in self._keyboards if k[0] is CalendarScope.DAYS and k[6] == specialist_id]:
+            self._keyboards.pop(key, None)
 
     def _init_views(self) -> dict[CalendarScope, CalendarScopeView]:
         return {
             CalendarScope.DAYS: CalendarDaysView(
                 self._item_callback_data,
-                date_text=MarkedDay(self._get_work_days),  # Динамическое получение рабочих дней
-                today_text=MarkedDay(self._get_work_days, mark_work="⭕", mark_non_work="⬜️"),  # Текущий день
+                date_text=MarkedDay(self._schedule, self._heatmap),  # Рабочие дни и свободные слоты
+                today_text=MarkedDay(self._schedule, self._heatmap, mark_work="⭕", mark_non_work="⬜️"),  # Текущий день
                 header_text="~~~~~ " + Month() + " ~~~~~",  # Заголовок с месяцем
                 weekday_text=WeekDay(),  # Отображение дней недели
                 next_month_text=Month() + " >>",  # Кнопка следующего месяца
@@ -134,14 +212,14 @@ service_dialog = Dialog(
     Window(
         Const(text='<b>Выберите специалиста:</b>'),
         Column(
-            Select(
-                Format('💈 {item[name]} 💈'),
+            CatalogSelect(
+                Format('💈 {item.name} 💈'),
                 id='spec',
-                item_id_getter=lambda item: item['id'],
                 items='specialists',
                 on_click=handle_specialist_selected
             )
         ),
+        SwitchTo(Const('⚡ Ближайшее свободное время'), id='fast_booking', state=ServicesSG.fast_service),
         Row(
             Cancel(text=Const('📛 Отменить')),
         ),
@@ -153,7 +231,7 @@ service_dialog = Dialog(
         Const(text='<b>Выберите услугу:</b>'),
         Column(services_kbd),
         Row(
-            Button(Const('◀️ Назад'), id='back_to_specialist', on_click=lambda c, b, m: m.back()),
+            Button(Const('◀️ Назад'), id='back_to_specialist', on_click=go_back),
             Cancel(text=Const('📛 Отменить'))
         ),
         state=ServicesSG.set_services,
@@ -168,28 +246,69 @@ service_dialog = Dialog(
         CustomCalendar(
             id = "calendar",
             on_click = on_date_selected,
-            work_days = lambda data, manager: manager.dialog_data.get("work_days", set()),
+            schedule = lambda data, manager: data.get("schedule"),
+            heatmap = lambda data, manager: data.get("heatmap"),
         ),
         Row(
-            Button(Const('◀️ Назад'), id = 'back_to_services', on_click = lambda c, b, m: m.back()),
+            Button(Const('◀️ Назад'), id = 'back_to_services', on_click = go_back),
             Cancel(text = Const('📛 Отменить'))
         ),
         state = ServicesSG.set_date,
-        getter = base_data_getter,
+        getter = calendar_data_getter,
         parse_mode = ParseMode.HTML,
     ),
     Window(
         Const("<b>Выберите время для записи:</b>"),
         Column(times_kbd),
         Row(
-            Button(Const('◀️ Назад'), id='back_to_date', on_click=lambda c, b, m: m.back()),
-                    Button(Const('Далее ➡'),id = 'next_to_check',on_click = lambda c, b, m: m.next()),
+            Button(Const('◀️ Назад'), id='back_to_date', on_click=go_back),
+                    Button(Const('Далее ➡'),id = 'next_to_check',on_click = on_time_confirmed),
                     Cancel(text=Const('📛 Отменить'))
         ),
         state=ServicesSG.set_time,
         getter=available_times_getter,
         parse_mode=ParseMode.HTML,
-    ))
+    ),
+    Window(
+        Const('<b>Выберите услугу, найдём ближайшее время у любого специалиста:</b>'),
+        Column(
+            CatalogSelect(
+                Format('{item.name}'),
+                id='fast_service',
+                items='services',
+                on_click=on_fast_service_selected,
+            )
+        ),
+        Row(
+            SwitchTo(Const('◀️ Назад'), id='back_to_specialists', state=ServicesSG.set_specialist),
+            Cancel(text=Const('📛 Отменить')),
+        ),
+        state=ServicesSG.fast_service,
+        getter=fast_services_getter,
+        parse_mode=ParseMode.HTML,
+    ),
+    Window(
+        Const('<b>Ближайшее свободное время:</b>', when='found'),
+        Const('Свободного времени в ближайшие дни не нашлось.', when=~F['found']),
+        Column(
+            Select(
+                Format('🕒 {item[0]}'),
+                id='nearest',
+                item_id_getter=operator.itemgetter(1),
+                items='slots',
+                on_click=on_nearest_selected,
+            )
+        ),
+        Row(
+            SwitchTo(Const('◀️ Назад'), id='back_to_fast_service', state=ServicesSG.fast_service),
+            Cancel(text=Const('📛 Отменить')),
+        ),
+        state=ServicesSG.fast_slots,
+        getter=nearest_slots_getter,
+        parse_mode=ParseMode.HTML,
+    ),
+    on_close=on_dialog_close,
+)
 #     Window(
 #         Format("<b>Подтвердите запись:</b>"),
 #         Group(
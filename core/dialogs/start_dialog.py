@@ -3,9 +3,11 @@ from aiogram_dialog.widgets.kbd import Button
 from aiogram_dialog.widgets.text import Const, Format
 
 from core.handlers.services_handlers.calendar import handle_registration
+from core.metrics import timed
 from core.states.StartSG import StartSG
 
 
+@timed("getter")
 async def get_username_data(dialog_manager: DialogManager, **kwargs):
     # Access the username from the dialog_manager event context
     username = dialog_manager.event.from_user.username if dialog_manager.event and dialog_manager.event.from_user else "User"
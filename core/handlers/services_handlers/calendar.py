@@ -1,65 +1,89 @@
+import asyncio
 import logging
-from datetime import datetime, date
+from datetime import date
+from typing import Optional
 
-from aiogram.client.session import aiohttp
+import aiohttp
 from aiogram.types import CallbackQuery
 from aiogram_dialog import DialogManager, StartMode
 
-from core.config_data.config import load_config
+from core.api.client import BackendClient
+from core.cache.prefetch import Prefetcher, schedule_key
+from core.cache.schedule import ScheduleIndex
+from core.handlers.services_handlers.prefetch import prefetch_times
+from core.handlers.services_handlers.schedule import load_schedule
+from core.metrics import timed
 from core.states.ServicesSG import ServicesSG
 
-config = load_config()
 logger = logging.getLogger(__name__)
 
 
-async def fetch_work_schedule(specialist_id: int):
-    url = f"{config.server.url}/work_schedules/specialist/{specialist_id}"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                return await response.json()
-            elif response.status == 404:
-                return []  # Если расписание отсутствует
-            else:
-                response_text = await response.text()
-                raise Exception(f"Ошибка при запросе расписания: {response.status} {response_text}")
-
-
-async def base_data_getter(dialog_manager: DialogManager, **kwargs):
+@timed("getter")
+async def base_data_getter(
+    dialog_manager: DialogManager,
+    backend: BackendClient,
+    schedules: ScheduleIndex,
+    prefetch: Optional[Prefetcher] = None,
+    **kwargs,
+):
     """
     Получить данные для отображения в календаре.
+
+    Расписание берётся из индекса: сеть нужна только при первом
+    открытии календаря специалиста и для фонового обновления. Если
+    расписание уже загружается заранее (после выбора специалиста),
+    геттер дожидается этой загрузки.
     """
     # Получаем ID специалиста из состояния FSM
     fsm_data = await dialog_manager.middleware_data["state"].get_data()
     specialist_id = fsm_data.get("selected_specialist_id")
 
-    # Запрашиваем расписание специалиста
     try:
-        work_schedule = await fetch_work_schedule(specialist_id)
-    except Exception as e:
-        # Логируем ошибки, если что-то пошло не так
-        print(f"Ошибка при получении расписания: {e}")
-        return {"work_days": set()}
-
-    # Формируем список рабочих дней
-    work_days = set(schedule["day_of_week"] for schedule in work_schedule)
-
-    return {"work_days": work_days}
-
-
+        if prefetch is not None:
+            schedule = await prefetch.take(
+                dialog_manager.event.from_user.id, schedule_key(specialist_id),
+                lambda: load_schedule(backend, schedules, specialist_id),
+            )
+        else:
+            schedule = await load_schedule(backend, schedules, specialist_id)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        # Сеть, таймаут, разомкнутый предохранитель или ошибка бэкенда
+        logger.error("Ошибка при получении расписания: %s", e)
+        return {"specialist_id": specialist_id, "schedule": None}
+
+    return {"specialist_id": specialist_id, "schedule": schedule}
+
+
+@timed("handler")
 async def on_date_selected(event, widget, manager: DialogManager, selected_date: date):
     """
     Обработчик выбора даты.
     """
     # Проверяем, является ли выбранная дата рабочей
-    work_days = manager.dialog_data.get("work_days", set())
-    if selected_date.isoformat() not in work_days:
+    fsm_data = await manager.middleware_data["state"].get_data()
+    specialist_id = fsm_data.get("selected_specialist_id")
+    try:
+        # Запись индекса могла быть сброшена уведомлением или истечь: загружаем, как геттер
+        schedule = await load_schedule(
+            manager.middleware_data["backend"], manager.middleware_data["schedules"], specialist_id,
+        )
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error("Ошибка при получении расписания: %s", e)
+        await event.answer("Не удалось проверить дату, попробуйте ещё раз")
+        return
+    if schedule is None or not schedule.is_work_day(selected_date):
         await event.answer("Записи закрыты")
         return  # Не переходим к следующему шагу
+    # None — число свободных слотов неизвестно (ещё не загружено или сброшено), не мешаем выбору
+    free = manager.middleware_data["heatmap"].peek(specialist_id, fsm_data.get("selected_service_id"), selected_date)
+    if free == 0:
+        await event.answer("На этот день свободного времени нет")
+        return
 
     # Сохраняем выбранную дату
     await manager.middleware_data["state"].update_data(selected_date=selected_date)
-    logger.info(f"Выбранная дата: {selected_date}")
+    logger.info("Выбранная дата: %s", selected_date)
+    prefetch_times(manager, fsm_data.get("selected_service_id"), specialist_id, selected_date)
 
     # Переход к следующему состоянию
     await manager.next()
@@ -67,27 +91,9 @@ async def on_date_selected(event, widget, manager: DialogManager, selected_date:
 
 
 
+@timed("handler")
 async def handle_registration(callback: CallbackQuery, button, dialog_manager: DialogManager):
     """
     Обработчик начала диалога с выбором специалиста.
     """
     await dialog_manager.start(ServicesSG.set_specialist, mode=StartMode.NORMAL)
-
-async def base_data_getter(dialog_manager: DialogManager, **kwargs):
-    fsm_data = await dialog_manager.middleware_data["state"].get_data()
-    specialist_id = fsm_data.get("selected_specialist_id")
-
-    try:
-        work_schedule = await fetch_work_schedule(specialist_id)
-    except Exception as e:
-        print(f"Ошибка при получении расписания: {e}")
-        return {"work_days": set()}
-
-    work_days = {
-        schedule["date"] for schedule in work_schedule
-        if datetime.strptime(schedule["date"], "%Y-%m-%d").date() >= datetime.now().date()
-    }
-
-    print(f"Рабочие дни специалиста: {work_days}")
-    dialog_manager.dialog_data["work_days"] = work_days  # Передача рабочих дней в dialog_data
-    return {"work_days": work_days}
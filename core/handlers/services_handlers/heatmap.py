@@ -0,0 +1,53 @@
+import datetime
+import logging
+from typing import Any, Dict, Optional
+
+from aiogram_dialog import DialogManager
+
+from core.api.client import BackendClient
+from core.cache.heatmap import AvailabilityHeatmap
+from core.cache.prefetch import Prefetcher
+from core.cache.schedule import ScheduleIndex
+from core.cache.slots import SlotEngine
+from core.cache.swr import SWRCache
+from core.handlers.services_handlers.calendar import base_data_getter
+from core.handlers.services_handlers.time import available_times_for
+from core.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+@timed("getter")
+async def calendar_data_getter(
+    dialog_manager: DialogManager,
+    backend: BackendClient,
+    catalog: SWRCache,
+    schedules: ScheduleIndex,
+    slots: SlotEngine,
+    heatmap: AvailabilityHeatmap,
+    prefetch: Prefetcher,
+    **kwargs,
+) -> Dict[str, Any]:
+    """
+    Данные календаря вместе с числом свободных слотов по рабочим дням видимого месяца.
+    """
+    data = await base_data_getter(dialog_manager, backend, schedules, prefetch)
+    data["heatmap"] = None
+    schedule = data["schedule"]
+    specialist_id = data["specialist_id"]
+    service_id = (await dialog_manager.middleware_data["state"].get_data()).get("selected_service_id")
+    if schedule is None or not specialist_id or not service_id:
+        return data
+
+    today = datetime.date.today()
+    offset = dialog_manager.find("calendar").get_offset() or today
+    days = [day for day in schedule.work_days(offset.year, offset.month) if day >= today]
+
+    async def count(day: datetime.date) -> Optional[int]:
+        times = await available_times_for(
+            backend, catalog, schedules, slots, service_id, specialist_id, day, strict=True,
+        )
+        return len(times) if times is not None else None
+
+    data["heatmap"] = await heatmap.month(specialist_id, service_id, days, count)
+    return data
@@ -0,0 +1,111 @@
+import datetime
+import logging
+from typing import Any, Dict, List
+
+from aiogram.types import CallbackQuery
+from aiogram_dialog import DialogManager
+from aiogram_dialog.widgets.kbd import Select
+
+from core.api.client import BackendClient
+from core.cache.catalog import EMPTY_CATALOG
+from core.cache.nearest import NearestSlots
+from core.cache.schedule import ScheduleIndex
+from core.cache.slots import SlotEngine
+from core.cache.swr import SWRCache
+from core.handlers.services_handlers.schedule import load_schedule
+from core.handlers.services_handlers.service import load_services_catalog
+from core.handlers.services_handlers.specialists import load_specialists_catalog
+from core.handlers.services_handlers.time import available_times_for, fetch_available_times, is_time_available
+from core.metrics import timed
+from core.states.ServicesSG import ServicesSG
+
+logger = logging.getLogger(__name__)
+
+
+@timed("getter")
+async def fast_services_getter(dialog_manager: DialogManager, backend: BackendClient, catalog: SWRCache, **kwargs):
+    """
+    Геттер списка услуг для быстрой записи.
+    """
+    services = await catalog.get("services", lambda: load_services_catalog(backend)) or EMPTY_CATALOG
+    return {"services": services}
+
+
+@timed("handler")
+async def on_fast_service_selected(callback: CallbackQuery, widget: Select, manager: DialogManager, item_id: str):
+    await manager.middleware_data["state"].update_data(selected_service_id=int(item_id))
+    await manager.switch_to(ServicesSG.fast_slots)
+
+
+@timed("getter")
+async def nearest_slots_getter(
+    dialog_manager: DialogManager,
+    backend: BackendClient,
+    catalog: SWRCache,
+    schedules: ScheduleIndex,
+    slots: SlotEngine,
+    nearest: NearestSlots,
+    **kwargs,
+) -> Dict[str, Any]:
+    """
+    Ближайшие свободные слоты выбранной услуги у всех специалистов.
+
+    Свободное время считается локально, если хватает данных, иначе
+    запрашивается `/available_times`.
+    """
+    fsm_data = await dialog_manager.middleware_data["state"].get_data()
+    service_id = fsm_data.get("selected_service_id")
+    specialists = await catalog.get("specialists", lambda: load_specialists_catalog(backend)) or EMPTY_CATALOG
+    if not service_id or not specialists:
+        return {"slots": [], "found": False}
+
+    today = datetime.date.today()
+    horizon = today + datetime.timedelta(days=slots.settings.horizon_days)
+
+    async def work_days(specialist_id: int) -> List[datetime.date]:
+        schedule = await load_schedule(backend, schedules, specialist_id)
+        days = []
+        for year, month in sorted(schedule.months):
+            days.extend(day for day in schedule.work_days(year, month) if today <= day < horizon)
+        return days
+
+    async def free_times(specialist_id: int, day: datetime.date) -> List[str]:
+        return await available_times_for(backend, catalog, schedules, slots, service_id, specialist_id, day)
+
+    found = await nearest.find(service_id, [item.id for item in specialists.items], work_days, free_times)
+    items = []
+    for day, time, specialist_id in found:
+        specialist = specialists.get(specialist_id)
+        name = specialist.name if specialist is not None else str(specialist_id)
+        items.append((f"{day:%d.%m} {time} — {name}", f"{specialist_id}|{day.isoformat()}|{time}"))
+    return {"slots": items, "found": bool(items)}
+
+
+@timed("handler")
+async def on_nearest_selected(callback: CallbackQuery, widget: Select, manager: DialogManager, item_id: str):
+    """
+    Выбор найденного слота: проверяем его у бэкенда и переходим к выбору времени.
+    """
+    specialist_id, day, time = item_id.split("|")
+    specialist_id, day = int(specialist_id), datetime.date.fromisoformat(day)
+    state = manager.middleware_data["state"]
+    service_id = (await state.get_data()).get("selected_service_id")
+
+    available_times = await fetch_available_times(
+        manager.middleware_data["backend"], service_id, specialist_id, day, strict=True,
+    )
+    if available_times is None:
+        # Бэкенд недоступен: занятость не подтверждена, кэши не трогаем
+        await callback.answer("Не удалось проверить время, попробуйте ещё раз")
+        return
+    if not is_time_available(time, available_times):
+        manager.middleware_data["nearest"].invalidate(service_id)
+        manager.middleware_data["slots"].invalidate(specialist_id)
+        manager.middleware_data["heatmap"].invalidate(specialist_id, day)
+        await callback.answer("Это время уже заняли, выберите другое")
+        return
+
+    await state.update_data(selected_specialist_id=specialist_id, selected_date=day)
+    await manager.switch_to(ServicesSG.set_time)
+    await manager.find("r_times").set_checked(time)
+    await callback.answer()
@@ -0,0 +1,61 @@
+import asyncio
+import datetime
+import logging
+
+from aiogram.types import CallbackQuery
+from aiogram_dialog import DialogManager
+
+from core.cache.prefetch import schedule_key, times_key
+from core.handlers.services_handlers.schedule import load_schedule
+from core.handlers.services_handlers.time import available_times_for, fetch_bookings
+from core.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+def prefetch_calendar(manager: DialogManager, specialist_id: int) -> None:
+    """
+    После выбора специалиста: заранее загрузить его расписание и записи для календаря.
+    """
+    data = manager.middleware_data
+    backend, schedules, slots = data["backend"], data["schedules"], data["slots"]
+    today = datetime.date.today()
+
+    async def load():
+        schedule, _ = await asyncio.gather(
+            load_schedule(backend, schedules, specialist_id),
+            slots.bookings(
+                specialist_id, today,
+                lambda date_from, date_to: fetch_bookings(backend, specialist_id, date_from, date_to),
+            ),
+        )
+        return schedule
+
+    data["prefetch"].start(manager.event.from_user.id, schedule_key(specialist_id), load)
+
+
+def prefetch_times(manager: DialogManager, service_id: int, specialist_id: int, day: datetime.date) -> None:
+    """
+    После выбора даты: заранее получить свободное время на неё.
+    """
+    data = manager.middleware_data
+    data["prefetch"].start(
+        manager.event.from_user.id,
+        times_key(service_id, specialist_id, day),
+        lambda: available_times_for(
+            data["backend"], data["catalog"], data["schedules"], data["slots"], service_id, specialist_id, day,
+        ),
+    )
+
+
+@timed("handler")
+async def go_back(callback: CallbackQuery, button, manager: DialogManager):
+    """
+    Кнопка «Назад»: упреждающая загрузка следующего шага больше не нужна.
+    """
+    manager.middleware_data["prefetch"].cancel(callback.from_user.id)
+    await manager.back()
+
+
+async def on_dialog_close(result, manager: DialogManager):
+    manager.middleware_data["prefetch"].cancel(manager.event.from_user.id)
@@ -0,0 +1,23 @@
+import logging
+
+from core.api.client import BackendClient, BackendStatusError
+from core.cache.schedule import ScheduleIndex, SpecialistSchedule
+
+logger = logging.getLogger(__name__)
+
+
+async def fetch_work_schedule(backend: BackendClient, specialist_id: int):
+    response = await backend.get(f"/work_schedules/specialist/{specialist_id}")
+    if response.status == 200:
+        return response.data
+    elif response.status == 404:
+        return []  # Если расписание отсутствует
+    else:
+        raise BackendStatusError(response.status, response.text)
+
+
+async def load_schedule(backend: BackendClient, schedules: ScheduleIndex, specialist_id: int) -> SpecialistSchedule:
+    """
+    Расписание специалиста из индекса; сеть нужна только при первом обращении.
+    """
+    return await schedules.get(specialist_id, lambda: fetch_work_schedule(backend, specialist_id))
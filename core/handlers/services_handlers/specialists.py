@@ -1,103 +1,105 @@
-import json
+import asyncio
 import logging
 from typing import Optional, List, Dict, Any
 
 import aiohttp
-from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery
 from aiogram_dialog import DialogManager
 from aiogram_dialog.widgets.kbd import Select
 
-from core.config_data.config import load_config
+from core.api.client import BackendClient
+from core.cache.catalog import EMPTY_CATALOG, Catalog, CatalogBuilder
+from core.cache.swr import SWRCache
+from core.handlers.services_handlers.prefetch import prefetch_calendar
+from core.metrics import timed
 
-config = load_config()
 logger = logging.getLogger(__name__)
 
+_catalog_builder = CatalogBuilder()
 
-async def get_specialists() -> Optional[List[Dict[str, Any]]]:
+
+async def get_specialists(backend: BackendClient) -> Optional[List[Dict[str, Any]]]:
     """
     Получение списка специалистов с API.
     """
-    get_specialist_url = f"{config.server.url}/specialists"
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(get_specialist_url) as response:
-                content_type = response.headers.get('Content-Type', '')
-                logger.info(f"Content-Type: {content_type}")
-                if response.status == 200:
-                    if 'application/json' in content_type:
-                        specialists = await response.json()
-                        logger.info(f"Получено специалистов: {specialists}")
-                        return specialists
-                    else:
-                        text = await response.text()
-                        try:
-                            specialists = json.loads(text)
-                            logger.info(f"Получено специалистов (ручная декодировка): {specialists}")
-                            return specialists
-                        except json.JSONDecodeError:
-                            logger.error("Не удалось декодировать ответ как JSON.")
-                            return None
-                elif response.status == 404:
-                    logger.info("Специалисты не найдены.")
-                    return None
-                else:
-                    error_text = await response.text()
-                    logger.error(f"Ошибка при запросе специалистов: {response.status}, {error_text}")
-                    return None
-    except aiohttp.ClientError as e:
-        logger.exception(f"Сетевая ошибка при запросе специалистов: {e}")
+        response = await backend.get("/specialists")
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.exception("Сетевая ошибка при запросе специалистов: %s", e)
         return None
 
+    if response.status == 200:
+        if response.data is None:
+            logger.error("Не удалось декодировать ответ как JSON.")
+            return None
+        logger.debug("Получено специалистов: %s", response.data)
+        return response.data
+    elif response.status == 404:
+        logger.info("Специалисты не найдены.")
+        return None
+    else:
+        logger.error("Ошибка при запросе специалистов: %s, %s", response.status, response.text)
+        return None
 
-async def get_specialists_data(dialog_manager: DialogManager, state: FSMContext, **kwargs) -> Dict[str, Any]:
+
+async def load_specialists_catalog(backend: BackendClient) -> Optional[Catalog]:
     """
-    Геттер данных специалистов для отображения в диалоге.
+    Загрузить специалистов и построить общий каталог с индексом по ID.
     """
-    specialists = await get_specialists()
-    if specialists:
-        specialists_list = [{'name': spec['name'], 'id': int(spec['id'])} for spec in specialists]
-    else:
-        specialists_list = []
+    specialists = await get_specialists(backend)
+    if specialists is None:
+        return None
+    return _catalog_builder.build(specialists)
 
-    # Сохраняем специалистов в FSM
-    await state.update_data(specialists=specialists_list)
-    logger.debug(f"Сохранено в FSM: {specialists_list}")
-    return {'specialists': specialists_list}
 
+@timed("getter")
+async def get_specialists_data(
+    dialog_manager: DialogManager, backend: BackendClient, catalog: SWRCache, **kwargs,
+) -> Dict[str, Any]:
+    """
+    Геттер данных специалистов для отображения в диалоге.
 
+    В FSM ничего не сохраняется: окно получает записи общего каталога.
+    """
+    specialists = await catalog.get("specialists", lambda: load_specialists_catalog(backend)) or EMPTY_CATALOG
+    return {'specialists': specialists}
+
+
+@timed("handler")
 async def handle_specialist_selected(event: CallbackQuery,widget: Select,manager: DialogManager,item_id: Any):
     """
     Обработчик выбора специалиста.
     """
     logger.debug("=== Обработчик handle_specialist_selected ===")
-    logger.debug(f"Событие: {event}")
-    logger.debug(f"Item ID: {item_id} (тип: {type(item_id)})")
+    logger.debug("Событие: %s", event)
+    logger.debug("Item ID: %s (тип: %s)", item_id, type(item_id))
 
     try:
         item_id = int(item_id)
     except ValueError:
-        logger.error(f"Неверный формат item_id: {item_id}")
+        logger.error("Неверный формат item_id: %s", item_id)
         await event.answer("Произошла ошибка при выборе специалиста.")
         return
 
-    # Получение специалистов из FSM
-    fsm_data = await manager.middleware_data["state"].get_data()
-    specialists = fsm_data.get('specialists', [])
-    logger.debug(f"Специалисты из FSM: {specialists}")
-
-    # Поиск специалиста
-    specialist = next((s for s in specialists if s['id'] == item_id), None)
+    # Поиск специалиста в общем каталоге по ID
+    # Запись могла быть сброшена уведомлением или после перезапуска: загружаем, как геттер
+    backend = manager.middleware_data["backend"]
+    specialists = await manager.middleware_data["catalog"].get(
+        "specialists", lambda: load_specialists_catalog(backend),
+    ) or EMPTY_CATALOG
+    specialist = specialists.get(item_id)
     if not specialist:
-        logger.error(f"Специалист с ID {item_id} не найден.")
+        logger.error("Специалист с ID %s не найден.", item_id)
         await event.answer("Произошла ошибка при выборе специалиста.")
         return
 
-    name = specialist.get('name', 'Неизвестно')
-    logger.info(f"Выбран специалист: {name} с ID: {item_id}")
+    name = specialist.name
+    logger.info("Выбран специалист: %s с ID: %s", name, item_id)
 
     # Сохранение выбранного специалиста в FSM
     await manager.middleware_data["state"].update_data(selected_specialist_id=item_id)
+    # Пока пользователь выбирает услугу, загружаем расписание для календаря
+    prefetch_calendar(manager, item_id)
 
     # # Обновляем сообщение
     # await event.message.edit_text(
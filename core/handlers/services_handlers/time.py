@@ -1,18 +1,24 @@
+import asyncio
 import datetime
-import json
+import logging
 
 import aiohttp
-import logging
 from operator import itemgetter
 from aiogram_dialog import DialogManager
 from aiogram_dialog.widgets.kbd import Radio
 from aiogram_dialog.widgets.text import Format, Const
 from aiogram.types import CallbackQuery
 
-from core.config_data.config import load_config
+from core.api.client import BackendClient
+from core.cache.catalog import EMPTY_CATALOG
+from core.cache.prefetch import Prefetcher, times_key
+from core.cache.schedule import ScheduleIndex, parse_minute
+from core.cache.slots import SlotEngine
+from core.cache.swr import SWRCache
+from core.handlers.services_handlers.schedule import load_schedule
+from core.metrics import timed
 
 logger = logging.getLogger(__name__)
-config = load_config()
 
 
 async def get_fsm_data(dialog_manager: DialogManager, keys: list[str]):
@@ -28,64 +34,176 @@ async def get_fsm_data(dialog_manager: DialogManager, keys: list[str]):
         extracted_data = {key: state_data.get(key) for key in keys}
 
         # Логирование данных
-        logger.debug(f"[FSM DATA] Извлеченные данные: {extracted_data}")
+        logger.debug("[FSM DATA] Извлеченные данные: %s", extracted_data)
 
         # Проверка на наличие недостающих данных
         missing_keys = [key for key, value in extracted_data.items() if value is None]
         if missing_keys:
-            logger.warning(f"[FSM DATA] Недостающие ключи: {missing_keys}")
+            logger.warning("[FSM DATA] Недостающие ключи: %s", missing_keys)
 
         return extracted_data
     except Exception as e:
-        logger.exception(f"[FSM DATA] Ошибка при извлечении данных: {e}")
+        logger.exception("[FSM DATA] Ошибка при извлечении данных: %s", e)
         return {}
 
 
-async def fetch_available_times(service_id: int, specialist_id: int, booking_date: str):
+async def fetch_available_times(
+    backend: BackendClient, service_id: int, specialist_id: int, booking_date: str, strict: bool = False,
+):
     """
     Запрос к API для получения доступного времени.
+
+    :param strict: при ошибке запроса вернуть `None` вместо пустого списка;
+        устаревший ответ при разомкнутом предохранителе тоже считается ошибкой.
     """
-    url = f"{config.server.url}/available_times"
 
     # Проверяем, что все параметры заданы
     if not service_id or not specialist_id or not booking_date:
         logger.error("Некорректные параметры для запроса доступного времени")
         return []
 
-    # Если booking_date - объект datetime.date, преобразуем его в строку
-    if isinstance(booking_date, (datetime.date, datetime)):
-        booking_date = booking_date.strftime("%Y-%m-%d")
-
     params = {
         "service_id": service_id,
         "specialist_id": specialist_id,
-        "booking_date": booking_date,
+        # Дата приходит объектом или ISO-строкой из FSM
+        "booking_date": _as_date(booking_date).isoformat(),
     }
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                # Обработка JSON-ответа
-                if response.headers.get("Content-Type", "").startswith("application/json"):
-                    return await response.json()  # Список доступных временных интервалов
-                else:
-                    # Если не JSON, попробуем обработать как текст
-                    text = await response.text()
-                    logger.warning(f"[FETCH AVAILABLE TIMES] Non-JSON response: {text}")
-                    try:
-                        return json.loads(text)
-                    except json.JSONDecodeError:
-                        logger.error("Ответ API не соответствует формату JSON.")
-                        return []
-    except Exception as e:
-        logger.exception(f"Ошибка при запросе доступного времени: {e}")
-        return []
+        response = await backend.get("/available_times", params=params, allow_stale=not strict)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.exception("Ошибка при запросе доступного времени: %s", e)
+        return None if strict else []
+
+    if response.status != 200:
+        logger.error("Ошибка при запросе доступного времени: %s, %s", response.status, response.text)
+        return None if strict else []
+    if not isinstance(response.data, list):
+        logger.error("Ответ API не соответствует формату JSON: %s", response.text)
+        return None if strict else []
+    return response.data  # Список доступных временных интервалов
+
+
+async def fetch_bookings(backend: BackendClient, specialist_id: int, date_from: datetime.date, date_to: datetime.date):
+    """
+    Запрос к API записей специалиста за период (для локального расчёта свободного времени).
+    """
+    params = {
+        "specialist_id": specialist_id,
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+    }
+    try:
+        response = await backend.get("/bookings", params=params)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.exception("Ошибка при запросе записей специалиста: %s", e)
+        return None
+
+    if response.status == 404:
+        # Эндпоинта может не быть: «нет записей» показало бы занятое время свободным
+        logger.debug("Записи специалиста %s недоступны (404), время запрашивается у /available_times", specialist_id)
+        return None
+    if response.status != 200 or not isinstance(response.data, list):
+        logger.error("Ошибка при запросе записей специалиста: %s, %s", response.status, response.text)
+        return None
+    return response.data
+
+
+def is_time_available(value: str, available_times: list) -> bool:
+    """
+    Есть ли время среди ответа API; сравниваются минуты, а не строки
+    («10:00» локального расчёта и «10:00:00» бэкенда — одно время).
+    """
+    minute = parse_minute(value)
+    return minute is not None and any(parse_minute(time) == minute for time in available_times)
+
+
+def _as_date(value) -> datetime.date:
+    return value if isinstance(value, datetime.date) else datetime.date.fromisoformat(str(value))
+
+
+async def local_available_times(
+    backend: BackendClient,
+    catalog: SWRCache,
+    schedules: ScheduleIndex,
+    slots: SlotEngine,
+    service_id: int,
+    specialist_id: int,
+    booking_date: datetime.date,
+):
+    """
+    Свободное время на дату, посчитанное локально.
+
+    Возвращает `None`, если данных для расчёта не хватает (нет длительности
+    услуги, часов работы или записей, либо дата за горизонтом) — тогда
+    время запрашивается у `/available_times`.
+    """
+    today = datetime.date.today()
+    if not 0 <= (booking_date - today).days < slots.settings.horizon_days:
+        return None
+
+    service = (catalog.peek("services") or EMPTY_CATALOG).get(service_id)
+    if service is None or not service.duration:
+        return None
+
+    try:
+        schedule = await load_schedule(backend, schedules, specialist_id)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error("Ошибка при получении расписания: %s", e)
+        return None
+    bookings = await slots.bookings(
+        specialist_id, today, lambda date_from, date_to: fetch_bookings(backend, specialist_id, date_from, date_to),
+    )
+    if bookings is None:
+        return None
+
+    now = datetime.datetime.now()
+    free = slots.free_slots(schedule, bookings, service.duration, today, now.hour * 60 + now.minute)
+    if free is None:
+        return None
+    return list(free.get(booking_date, ()))
+
+
+async def available_times_for(
+    backend: BackendClient,
+    catalog: SWRCache,
+    schedules: ScheduleIndex,
+    slots: SlotEngine,
+    service_id: int,
+    specialist_id: int,
+    booking_date: datetime.date,
+    strict: bool = False,
+):
+    """
+    Свободное время на дату: локальный расчёт, а если данных не хватает — `/available_times`.
+    """
+    available_times = await local_available_times(
+        backend, catalog, schedules, slots, service_id, specialist_id, booking_date,
+    )
+    if available_times is None:
+        # Логируем параметры перед запросом
+        logger.debug("[AVAILABLE TIMES] Запрашиваем доступное время для service_id=%s, specialist_id=%s, booking_date=%s", service_id, specialist_id, booking_date)
+        available_times = await fetch_available_times(backend, service_id, specialist_id, booking_date, strict)
+    return available_times
 
 
 # Widget Radio для отображения времени
-async def available_times_getter(dialog_manager: DialogManager, **kwargs):
+@timed("getter")
+async def available_times_getter(
+    dialog_manager: DialogManager,
+    backend: BackendClient,
+    catalog: SWRCache,
+    schedules: ScheduleIndex,
+    slots: SlotEngine,
+    prefetch: Prefetcher,
+    **kwargs,
+):
     """
     Геттер для получения доступного времени и передачи его в Radio-кнопки.
+
+    Время считается локально по расписанию и записям специалиста;
+    `/available_times` вызывается, только если локальных данных не хватает.
+    Обычно результат уже загружен заранее при выборе даты.
     """
     fsm_data = await get_fsm_data(dialog_manager, ["selected_service_id", "selected_specialist_id", "selected_date"])
     service_id = fsm_data.get("selected_service_id")
@@ -93,20 +211,22 @@ async def available_times_getter(dialog_manager: DialogManager, **kwargs):
     booking_date = fsm_data.get("selected_date")
 
     if not service_id or not specialist_id or not booking_date:
-        logger.error(f"[AVAILABLE TIMES] Недостаточно данных для запроса времени: {fsm_data}")
+        logger.error("[AVAILABLE TIMES] Недостаточно данных для запроса времени: %s", fsm_data)
         return {"available_times": []}
 
-    # Логируем параметры перед запросом
-    logger.debug(f"[AVAILABLE TIMES] Запрашиваем доступное время для service_id={service_id}, specialist_id={specialist_id}, booking_date={booking_date}")
-
-    available_times = await fetch_available_times(service_id, specialist_id, booking_date)
+    booking_date = _as_date(booking_date)
+    available_times = await prefetch.take(
+        dialog_manager.event.from_user.id,
+        times_key(service_id, specialist_id, booking_date),
+        lambda: available_times_for(backend, catalog, schedules, slots, service_id, specialist_id, booking_date),
+    )
 
     if not available_times:
-        logger.warning(f"[AVAILABLE TIMES] Нет доступных временных интервалов для service_id={service_id}, specialist_id={specialist_id}, booking_date={booking_date}")
+        logger.warning("[AVAILABLE TIMES] Нет доступных временных интервалов для service_id=%s, specialist_id=%s, booking_date=%s", service_id, specialist_id, booking_date)
         return {"available_times": []}
 
     times = [(time, time) for time in available_times]
-    logger.debug(f"[AVAILABLE TIMES] Доступные временные интервалы: {times}")
+    logger.debug("[AVAILABLE TIMES] Доступные временные интервалы: %s", times)
     return {"available_times": times}
 
 
@@ -121,19 +241,61 @@ times_kbd = Radio(
 
 
 # Обработчик выбора времени
+@timed("handler")
 async def on_time_selected(callback: CallbackQuery, widget: Radio, manager: DialogManager, item_id: str):
     """
     Обработчик выбора времени.
     """
-    logger.info(f"[TIME SELECTED] Пользователь выбрал время: {item_id}")
+    logger.info("[TIME SELECTED] Пользователь выбрал время: %s", item_id)
 
     # Сохраняем время в FSM
     await manager.middleware_data["state"].update_data(selected_time=item_id)
 
-    # Логируем текущее состояние FSM
-    current_state_data = await manager.middleware_data["state"].get_data()
-    logger.debug(f"[FSM DATA AFTER TIME SELECTED] Текущее состояние FSM: {current_state_data}")
+    # Логируем текущее состояние FSM (лишнее чтение — только при DEBUG)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[FSM DATA AFTER TIME SELECTED] Текущее состояние FSM: %s", await manager.middleware_data["state"].get_data())
 
     # Подтверждаем выбор
     await callback.message.edit_text(f"Вы выбрали время: <b>{item_id}</b>.", parse_mode="HTML")
     await manager.next()
+
+
+@timed("handler")
+async def on_time_confirmed(callback: CallbackQuery, button, manager: DialogManager):
+    """
+    Переход дальше с выбранным временем.
+
+    Локально посчитанное время могло устареть, поэтому выбранный слот
+    один раз проверяется у бэкенда. Если он уже занят, записи специалиста
+    перезагружаются и список времени обновляется.
+    """
+    item_id = manager.find("r_times").get_checked()
+    if item_id is None:
+        await callback.answer("Выберите время")
+        return
+
+    fsm_data = await get_fsm_data(manager, ["selected_service_id", "selected_specialist_id", "selected_date"])
+    specialist_id = fsm_data.get("selected_specialist_id")
+    available_times = await fetch_available_times(
+        manager.middleware_data["backend"],
+        fsm_data.get("selected_service_id"),
+        specialist_id,
+        _as_date(fsm_data.get("selected_date")),
+        strict = True,
+    )
+    if available_times is None:
+        # Бэкенд недоступен: занятость не подтверждена, кэши не трогаем
+        await callback.answer("Не удалось проверить время, попробуйте ещё раз")
+        return
+    if not is_time_available(item_id, available_times):
+        logger.info("[TIME SELECTED] Время %s уже занято", item_id)
+        manager.middleware_data["slots"].invalidate(specialist_id)
+        manager.middleware_data["prefetch"].cancel(callback.from_user.id)
+        manager.middleware_data["heatmap"].invalidate(specialist_id, _as_date(fsm_data.get("selected_date")))
+        await callback.answer("Это время уже заняли, выберите другое")
+        return
+
+    await manager.middleware_data["state"].update_data(selected_time=item_id)
+    # Окна подтверждения пока нет: после времени следуют окна быстрой записи, поэтому не next()
+    await callback.message.edit_text(f"Вы выбрали время: <b>{item_id}</b>.", parse_mode="HTML")
+    await manager.done()
@@ -1,81 +1,90 @@
 import logging
 
-import aiohttp
 from aiogram import Router
 from aiogram.filters import CommandStart
 from aiogram.types import CallbackQuery, KeyboardButton, ReplyKeyboardMarkup, Message
 from aiogram_dialog import DialogManager, StartMode
 
-from core.config_data.config import load_config
+from core.api.client import BackendClient
+from core.cache.users import MISS, UserCache
+from core.metrics import timed
 from core.states.ContactSG import ContactSG
 from core.states.StartSG import StartSG
 
 start_router = Router()
 logger = logging.getLogger(__name__)
 
-config = load_config()
 
 
-async def get_user(tg_id: int):
-    get_user_url = f"{config.server.url}/users/{tg_id}"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(get_user_url) as response:
-            if response.status == 200:
-                logger.info("Пользователь найден в базе данных.")
-                return await response.json()  # Пользователь найден, возвращаем его данные
-            elif response.status == 404:
-                logger.info("Пользователь не найден, требуется регистрация.")
-                return None  # Пользователь не найден
-            else:
-                logger.error(f"Ошибка при запросе пользователя: {response.status}")
-                return f"Error: {response.status}"  # Ошибка при выполнении запроса
+async def get_user(backend: BackendClient, users: UserCache, tg_id: int):
+    user = users.get(tg_id)
+    if user is not MISS:
+        return user  # Ответ из кэша: данные пользователя или None
+
+    response = await backend.get(f"/users/{tg_id}")
+    if response.status == 200:
+        logger.info("Пользователь найден в базе данных.")
+        users.remember(tg_id, response.data)
+        return response.data  # Пользователь найден, возвращаем его данные
+    elif response.status == 404:
+        logger.info("Пользователь не найден, требуется регистрация.")
+        users.remember_missing(tg_id)
+        return None  # Пользователь не найден
+    else:
+        logger.error("Ошибка при запросе пользователя: %s", response.status)
+        return f"Error: {response.status}"  # Ошибка при выполнении запроса
 
 
-async def get_or_create_user(tg_id: int, username: str, phone: str):
-    user = await get_user(tg_id)
-    if user is not None:
+async def get_or_create_user(backend: BackendClient, users: UserCache, tg_id: int, username: str, phone: str):
+    user = users.get(tg_id)
+    if user is not MISS and user is not None:
         return user  # Пользователь уже существует
 
-    create_user_url = f"{config.server.url}/users"
+    # Один запрос вместо GET + POST: 409 означает, что пользователь уже есть
     user_data = {"tgID": tg_id, "username": username, "phone": phone}
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(create_user_url, json=user_data) as create_response:
-            if create_response.status == 201:
-                # Если успешное создание, просто возвращаем подтверждение
-                return "User created successfully"
-            elif create_response.status == 409:
-                return "User already exists"
-            else:
-                return f"Failed to create user: {create_response.status}"
+    create_response = await backend.post("/users", json_body=user_data)
+    if create_response.status == 201:
+        users.remember(tg_id, create_response.data or user_data)
+        # Если успешное создание, просто возвращаем подтверждение
+        return "User created successfully"
+    elif create_response.status == 409:
+        users.remember(tg_id, user_data)
+        return "User already exists"
+    else:
+        return f"Failed to create user: {create_response.status}"
 
 
             
 @start_router.message(CommandStart())
-async def cmd_start(msg: Message, dialog_manager: DialogManager):
+@timed("handler")
+async def cmd_start(msg: Message, dialog_manager: DialogManager, backend: BackendClient, users: UserCache):
     tg_id = msg.from_user.id
-    user = await get_user(tg_id)
+    user = await get_user(backend, users, tg_id)
 
     if user is None:
-        logger.info(f"Запуск диалога для запроса контакта для пользователя с tg_id={tg_id}")
+        logger.info("Запуск диалога для запроса контакта для пользователя с tg_id=%s", tg_id)
         await dialog_manager.start(ContactSG.start, mode=StartMode.RESET_STACK)
     else:
-        logger.info(f"Пользователь с tg_id={tg_id} уже зарегистрирован.")
+        logger.info("Пользователь с tg_id=%s уже зарегистрирован.", tg_id)
         await dialog_manager.start(StartSG.start, mode=StartMode.RESET_STACK)
 
 
+@timed("handler")
 async def get_contact(msg: Message, _, dialog_manager: DialogManager):
     await msg.bot.delete_message(msg.chat.id, dialog_manager.dialog_data["message_id"])
     await dialog_manager.done()
-    print(msg.contact.phone_number)
     phone = msg.contact.phone_number
     tg_id = msg.from_user.id
     username = msg.from_user.username or "Anonymous"
-    result = await get_or_create_user(tg_id, username, phone)
+    backend = dialog_manager.middleware_data["backend"]
+    users = dialog_manager.middleware_data["users"]
+    result = await get_or_create_user(backend, users, tg_id, username, phone)
     await dialog_manager.start(StartSG.start, mode=StartMode.RESET_STACK)
      
 
 
+@timed("handler")
 async def send_contact(cq: CallbackQuery, _, dialog_manager: DialogManager):
     markup = ReplyKeyboardMarkup(keyboard=[[
         KeyboardButton(text="📲 Поделиться контактом", request_contact=True)
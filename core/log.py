@@ -0,0 +1,140 @@
+import json
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from core.config_data.config import Logging
+
+TEXT_FORMAT = "[%(asctime)s] #%(levelname)-8s %(filename)s:%(lineno)d - %(name)s - %(message)s"
+
+
+class _QueueHandler(QueueHandler):
+    """
+    Кладёт записи в ограниченную очередь, не дожидаясь вывода.
+
+    Текст сообщения подставляется здесь, до постановки в очередь:
+    аргументы — живые объекты цикла событий и могут измениться, пока
+    запись ждёт вывода; traceback тоже сохраняется текстом. Остальное
+    форматирование — в фоновом потоке. Если очередь заполнена, запись
+    отбрасывается и учитывается в `dropped`: цикл событий никогда не ждёт вывода.
+    """
+
+    def __init__(self, records: queue.Queue):
+        super().__init__(records)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _TRACEBACK.formatException(record.exc_info)
+            # Кадры стека не должны жить дольше записи в очереди
+            record.exc_info = None
+        return record
+
+
+class _DebugSampler(logging.Filter):
+    """
+    Пропускает долю `rate` записей DEBUG (там логируются данные целиком).
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class TextFormatter(logging.Formatter):
+    """
+    Текстовый формат с обрезкой длинных сообщений до `max_length` символов.
+    """
+
+    def __init__(self, max_length: int):
+        super().__init__(TEXT_FORMAT)
+        self.max_length = max_length
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        record.message = _truncate(record.message, self.max_length)
+        return super().formatMessage(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Одна запись — одна строка JSON для сборщиков логов.
+    """
+
+    def __init__(self, max_length: int):
+        super().__init__()
+        self.max_length = max_length
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": _truncate(record.getMessage(), self.max_length),
+            "where": f"{record.filename}:{record.lineno}",
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _truncate(message: str, max_length: int) -> str:
+    if max_length and len(message) > max_length:
+        return f"{message[:max_length]}… [+{len(message) - max_length} симв.]"
+    return message
+
+
+_TRACEBACK = logging.Formatter()
+_handler: Optional[_QueueHandler] = None
+
+
+def setup_logging(settings: Logging) -> QueueListener:
+    """
+    Направить логи через очередь в фоновый поток.
+
+    Возвращает запущенный `QueueListener`; его `stop()` дописывает
+    оставшиеся записи при остановке.
+    """
+    global _handler
+    records: queue.Queue = queue.Queue(maxsize=settings.queue_size)
+    output = logging.StreamHandler(sys.stderr)
+    if settings.format == "json":
+        output.setFormatter(JsonFormatter(settings.max_length))
+    elif settings.format == "text":
+        output.setFormatter(TextFormatter(settings.max_length))
+    else:
+        raise ValueError(f"Неизвестный формат логов: {settings.format}")
+
+    _handler = _QueueHandler(records)
+    if settings.debug_sample_rate < 1.0:
+        _handler.addFilter(_DebugSampler(settings.debug_sample_rate))
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+    root.setLevel(settings.level.upper())
+
+    listener = QueueListener(records, output, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def dropped() -> int:
+    """
+    Сколько записей отброшено из-за переполненной очереди.
+    """
+    return _handler.dropped if _handler is not None else 0
@@ -0,0 +1,285 @@
+import abc
+import functools
+import time
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+from core import tracing
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+# Границы корзин гистограмм времени, сек.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # Последняя корзина — +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """
+        Брать значение из `function` в момент отдачи метрик.
+        """
+        self.function = function
+
+    def get(self) -> float:
+        return self.function() if self.function is not None else self.value
+
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+
+    def labels(self, *values: Any):
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: ожидались метки {self.labelnames}, получено {key}")
+            child = self._children[key] = self._new_child()
+        return child
+
+    @abc.abstractmethod
+    def _new_child(self):
+        ...
+
+    def _label_text(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    @abc.abstractmethod
+    def render(self) -> List[str]:
+        ...
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str], buckets: Tuple[float, ...]):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def render(self) -> List[str]:
+        lines = []
+        for values, child in sorted(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = self._label_text(values, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(values)} {child.sum}")
+            lines.append(f"{self.name}_count{self._label_text(values)} {cumulative}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{self._label_text(values)} {child.value}"
+            for values, child in sorted(self._children.items())
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{self._label_text(values)} {child.get()}"
+            for values, child in sorted(self._children.items())
+        ]
+
+
+class Registry:
+    """
+    Метрики процесса: гистограммы времени, счётчики и текущие значения с метками.
+
+    Запись — поиск в словаре по меткам и инкремент без блокировок
+    (всё выполняется в одном цикле событий). Пока `enabled` ложно,
+    обёртки `timed` и вызывающий код пропускают измерения.
+    Отдаётся в текстовом формате Prometheus через `render`.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._metrics: Dict[str, _Metric] = {}
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def _register(self, metric: _Metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                raise ValueError(f"Метрика {metric.name} уже зарегистрирована с другими параметрами")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def timed(self, kind: str, name: Optional[str] = None) -> Callable[[F], F]:
+        """
+        Декоратор корутины: время выполнения попадает в `bot_handler_seconds{kind, name}`
+        и спаном в трассировку апдейта, если она ведётся.
+        """
+        def decorator(func: F) -> F:
+            label = name or func.__name__
+            child = None
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                nonlocal child
+                trace = tracing.current()
+                if not self.enabled and trace is None:
+                    return await func(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    finished = time.perf_counter()
+                    if self.enabled:
+                        if child is None:
+                            child = HANDLER_SECONDS.labels(kind, label)
+                        child.observe(finished - started)
+                    if trace is not None:
+                        trace.add(label, kind, started, finished)
+
+            return wrapper
+        return decorator
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+REGISTRY = Registry()
+timed = REGISTRY.timed
+
+HANDLER_SECONDS = REGISTRY.histogram(
+    "bot_handler_seconds", "Время геттеров окон и обработчиков нажатий", ("kind", "name"),
+)
+UPDATE_SECONDS = REGISTRY.histogram(
+    "bot_update_seconds", "Время обработки апдейта целиком", ("type",),
+)
+BACKEND_SECONDS = REGISTRY.histogram(
+    "bot_backend_request_seconds", "Время запросов к API бэкенда", ("method", "endpoint", "status"),
+)
+BACKEND_BYTES = REGISTRY.counter(
+    "bot_backend_response_bytes_total", "Байты тел ответов API бэкенда", ("method", "endpoint"),
+)
+BACKEND_CONDITIONAL = REGISTRY.counter(
+    "bot_backend_conditional_requests_total", "Условные GET-запросы к API: not_modified — ответ 304",
+    ("endpoint", "result"),
+)
+BACKEND_HEDGES = REGISTRY.counter(
+    "bot_backend_hedged_requests_total", "Дубли медленных GET-запросов: sent — отправлен, won — ответил первым",
+    ("endpoint", "result"),
+)
+BACKEND_BREAKER = REGISTRY.counter(
+    "bot_backend_breaker_events_total",
+    "Предохранители API: opened — разомкнут, rejected — запрос отклонён, stale — отдан прошлый ответ",
+    ("endpoint", "event"),
+)
+TELEGRAM_SECONDS = REGISTRY.histogram(
+    "bot_telegram_request_seconds", "Время запросов к Telegram Bot API", ("method",),
+)
+TELEGRAM_REQUESTS = REGISTRY.counter(
+    "bot_telegram_requests_total", "Запросы к Telegram Bot API", ("method", "result"),
+)
+FSM_SECONDS = REGISTRY.histogram(
+    "bot_fsm_operation_seconds", "Время операций хранилища FSM", ("operation",),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+FSM_OPERATIONS = REGISTRY.counter(
+    "bot_fsm_operations_total", "Операции хранилища FSM", ("operation",),
+)
+BACKEND_POOL = REGISTRY.gauge(
+    "bot_backend_pool_connections",
+    "Соединения пула API бэкенда: acquired — заняты, idle — свободны, limit — предел пула",
+    ("state",),
+)
+BACKEND_IN_FLIGHT = REGISTRY.gauge(
+    "bot_backend_in_flight_requests", "Запросы к API бэкенда, ожидающие ответа",
+)
+SCHEDULER_WAIT = REGISTRY.histogram(
+    "bot_scheduler_wait_seconds",
+    "Ожидание апдейта в планировщике: user — очередь пользователя, slot — общий лимит обработчиков",
+    ("stage",),
+)
+SCHEDULER_UPDATES = REGISTRY.gauge(
+    "bot_scheduler_updates", "Апдейты в планировщике: queued — ждут, running — обрабатываются", ("state",),
+)
+PREFETCH_RESULTS = REGISTRY.counter(
+    "bot_prefetch_results_total",
+    "Упреждающая загрузка: hit — результат готов, inflight_hit — дождались загрузки, "
+    "miss — загрузки не было, wasted — не понадобился, cancelled — отменена",
+    ("result",),
+)
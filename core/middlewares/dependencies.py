@@ -0,0 +1,25 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+
+class DependenciesMiddleware(BaseMiddleware):
+    """
+    Передаёт общие объекты процесса (клиент API, кэши) в данные обработчиков.
+
+    Каждый именованный аргумент попадает в `data` под своим именем,
+    например `backend` или `catalog`.
+    """
+
+    def __init__(self, **dependencies: Any):
+        self.dependencies = dependencies
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        data.update(self.dependencies)
+        return await handler(event, data)
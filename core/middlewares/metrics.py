@@ -0,0 +1,62 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+
+from core import tracing
+from core.metrics import REGISTRY, TELEGRAM_REQUESTS, TELEGRAM_SECONDS, UPDATE_SECONDS
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """
+    Время обработки апдейта целиком по типу события (message, callback_query…).
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not REGISTRY.enabled:
+            return await handler(event, data)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            event_type = event.event_type if isinstance(event, Update) else type(event).__name__
+            UPDATE_SECONDS.labels(event_type).observe(time.perf_counter() - started)
+
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    """
+    Счётчики и время запросов к Telegram Bot API по методам; при трассировке — спаны.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        trace = tracing.current()
+        if not REGISTRY.enabled and trace is None:
+            return await make_request(bot, method)
+        name = type(method).__name__
+        started = time.perf_counter()
+        result = "error"
+        try:
+            response = await make_request(bot, method)
+            result = "ok"
+            return response
+        finally:
+            finished = time.perf_counter()
+            if REGISTRY.enabled:
+                TELEGRAM_SECONDS.labels(name).observe(finished - started)
+                TELEGRAM_REQUESTS.labels(name, result).inc()
+            if trace is not None:
+                trace.add(name, "telegram", started, finished, {"result": result})
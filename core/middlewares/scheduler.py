@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.types import TelegramObject, Update
+
+from core import tracing
+from core.config_data.config import Scheduler
+from core.metrics import REGISTRY, SCHEDULER_WAIT
+
+logger = logging.getLogger(__name__)
+
+# Политики переполнения общей очереди
+DROP = "drop"
+BUSY = "busy"
+
+
+class _Lane:
+    """
+    Очередь одного пользователя: FIFO-замок и число апдейтов в ней.
+    """
+    __slots__ = ("lock", "size")
+
+    def __init__(self):
+        # asyncio.Lock отдаёт замок ожидающим в порядке очереди
+        self.lock = asyncio.Lock()
+        self.size = 0
+
+
+class _WaitStats:
+    """
+    Время ожидания в очереди: счётчики и последние `window` замеров для перцентилей.
+    """
+
+    def __init__(self, window: int = 1024):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self._samples.append(seconds)
+
+    def snapshot(self) -> Dict[str, float]:
+        samples = sorted(self._samples)
+
+        def percentile(q: float) -> float:
+            return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "max": self.max,
+        }
+
+
+class SchedulerMiddleware(BaseMiddleware):
+    """
+    Планировщик апдейтов.
+
+    Апдейты одного пользователя обрабатываются строго по очереди, поэтому
+    быстрые нажатия не гоняются за `dialog_data`. Одновременно выполняется
+    не больше `max_concurrency` обработчиков. Всего в ожидании может быть
+    не больше `queue_size` апдейтов; лишние отбрасываются (`drop`) или
+    получают ответ «бот занят» (`busy`).
+
+    Время ожидания считается отдельно для очереди пользователя и для
+    общего лимита обработчиков, см. `stats()`.
+    """
+
+    def __init__(self, settings: Scheduler):
+        if settings.overflow not in (DROP, BUSY):
+            raise ValueError(f"Неизвестная политика переполнения: {settings.overflow}")
+        self.settings = settings
+        self._slots = asyncio.Semaphore(settings.max_concurrency)
+        self._lanes: Dict[int, _Lane] = {}
+        self.queued = 0
+        self.running = 0
+        self.dropped = 0
+        self.busy_replies = 0
+        self.user_wait = _WaitStats()
+        self.slot_wait = _WaitStats()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if self.queued >= self.settings.queue_size:
+            await self._overflow(event, data)
+            return None
+
+        user = data.get("event_from_user")
+        lane = self._lane(user.id) if user is not None else None
+        self.queued += 1
+        waiting = True
+        started = time.monotonic()
+        traced = time.perf_counter()
+        try:
+            if lane is not None:
+                await lane.lock.acquire()
+            try:
+                locked = time.monotonic()
+                self.user_wait.observe(locked - started)
+                async with self._slots:
+                    acquired = time.monotonic()
+                    self.slot_wait.observe(acquired - locked)
+                    if REGISTRY.enabled:
+                        SCHEDULER_WAIT.labels("user").observe(locked - started)
+                        SCHEDULER_WAIT.labels("slot").observe(acquired - locked)
+                    tracing.record("scheduler.wait", "middleware", traced)
+                    self.queued -= 1
+                    waiting = False
+                    self.running += 1
+                    try:
+                        return await handler(event, data)
+                    finally:
+                        self.running -= 1
+            finally:
+                if lane is not None:
+                    lane.lock.release()
+        finally:
+            if waiting:
+                self.queued -= 1
+            if lane is not None:
+                self._release_lane(user.id, lane)
+
+    def _lane(self, user_id: int) -> _Lane:
+        lane = self._lanes.get(user_id)
+        if lane is None:
+            lane = self._lanes[user_id] = _Lane()
+        lane.size += 1
+        return lane
+
+    def _release_lane(self, user_id: int, lane: _Lane) -> None:
+        lane.size -= 1
+        if lane.size == 0:
+            del self._lanes[user_id]
+
+    async def _overflow(self, event: TelegramObject, data: Dict[str, Any]) -> None:
+        self.dropped += 1
+        logger.warning("Очередь апдейтов переполнена (%d), апдейт отброшен", self.queued)
+        if self.settings.overflow != BUSY or not isinstance(event, Update):
+            return
+        bot: Optional[Bot] = data.get("bot")
+        if bot is None:
+            return
+        try:
+            if event.callback_query is not None:
+                await bot.answer_callback_query(event.callback_query.id, text=self.settings.busy_text)
+            elif event.message is not None:
+                await bot.send_message(event.message.chat.id, self.settings.busy_text)
+            else:
+                return
+        except Exception:
+            logger.exception("Не удалось отправить ответ о перегрузке")
+            return
+        self.busy_replies += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued": self.queued,
+            "users": len(self._lanes),
+            "dropped": self.dropped,
+            "busy_replies": self.busy_replies,
+            "user_wait": self.user_wait.snapshot(),
+            "slot_wait": self.slot_wait.snapshot(),
+        }
@@ -0,0 +1,54 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from core import tracing
+from core.tracing import Tracer
+
+
+class TracingMiddleware(BaseMiddleware):
+    """
+    Внешний middleware диспетчера: открывает трассировку апдейта.
+
+    Корневой спан `update` покрывает всю обработку, включая остальные
+    middleware; спаны геттеров, обработчиков, запросов к API, операций
+    FSM и запросов к Telegram добавляются из соответствующих мест.
+    """
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        event_type = event.event_type if isinstance(event, Update) else type(event).__name__
+        trace = self.tracer.start(f"update {getattr(event, 'update_id', '?')} ({event_type})")
+        if trace is None:
+            return await handler(event, data)
+        token = tracing.activate(trace)
+        try:
+            with tracing.span("update", "update", {"type": event_type}):
+                return await handler(event, data)
+        finally:
+            tracing.deactivate(token)
+            self.tracer.finish(trace)
+
+
+class DispatchTracingMiddleware(BaseMiddleware):
+    """
+    Внутренний middleware `dp.update`: спан от конца внешних middleware
+    до конца обработки, чтобы их собственное время было видно отдельно.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        with tracing.span("dispatch", "middleware"):
+            return await handler(event, data)
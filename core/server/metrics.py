@@ -0,0 +1,30 @@
+import logging
+
+from aiohttp import web
+
+from core.config_data.config import Metrics
+from core.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+async def _metrics(request: web.Request) -> web.Response:
+    return web.Response(body=REGISTRY.render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+
+async def start_metrics_server(settings: Metrics, port_offset: int = 0) -> web.AppRunner:
+    """
+    Запустить HTTP-сервер с метриками в формате Prometheus.
+
+    Возвращает runner; сервер останавливается через `runner.cleanup()`.
+    """
+    app = web.Application()
+    app.router.add_get(settings.path, _metrics)
+    runner = web.AppRunner(app, handle_signals=False, access_log=None)
+    await runner.setup()
+    port = settings.port + port_offset
+    await web.TCPSite(runner, host=settings.host, port=port).start()
+    logger.info("Метрики доступны на %s:%s%s", settings.host, port, settings.path)
+    return runner
@@ -0,0 +1,211 @@
+import asyncio
+import hmac
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+from core.api.client import BackendClient
+from core.cache.invalidation import InvalidEvent, Invalidator
+from core.config_data.config import Push
+from core.handlers.services_handlers.schedule import fetch_work_schedule
+from core.handlers.services_handlers.service import load_services_catalog
+from core.handlers.services_handlers.specialists import load_specialists_catalog
+
+logger = logging.getLogger(__name__)
+
+MAX_RECONNECT_DELAY = 30.0
+
+
+class PushChannel:
+    """
+    Канал уведомлений бэкенда об изменениях каталога, расписаний и записей.
+
+    Уведомления (см. `Invalidator`) приходят двумя путями, можно обоими:
+
+    - HTTP: `POST <path>` с заголовком `Authorization: Bearer <secret>`,
+      тело — объект уведомления или список объектов;
+    - SSE: бот сам подписывается на `SERVER_URL + sse_path` и читает
+      события `data: {...}`. При обрыве переподключается с паузой
+      от `reconnect_delay` до 30 секунд.
+
+    Пока SSE-поток недоступен, каталог и расписания перезагружаются
+    раз в `poll_interval` секунд; после переподключения — один
+    внеочередной раз, чтобы не потерять пропущенные изменения.
+    """
+
+    def __init__(self, settings: Push, backend: BackendClient, invalidator: Invalidator, port_offset: int = 0):
+        self.settings = settings
+        self.backend = backend
+        self.invalidator = invalidator
+        self.port_offset = port_offset
+        self.connected = False
+        self._runner: Optional[web.AppRunner] = None
+        self._tasks: List[asyncio.Task] = []
+        self.received = 0
+        self.reconnects = 0
+        self.polls = 0
+
+    async def start(self) -> None:
+        if self.settings.http_enabled:
+            if not self.settings.secret:
+                logger.error("PUSH_SECRET не задан, приёмник уведомлений не запущен")
+            else:
+                await self._start_http()
+        if self.settings.sse_path:
+            self._tasks.append(asyncio.create_task(self._subscribe()))
+            self._tasks.append(asyncio.create_task(self._poll_while_disconnected()))
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    # --- HTTP ---------------------------------------------------------------
+
+    async def _start_http(self) -> None:
+        app = web.Application()
+        app.router.add_post(self.settings.path, self._handle)
+        self._runner = web.AppRunner(app, handle_signals=False, access_log=None)
+        await self._runner.setup()
+        port = self.settings.port + self.port_offset
+        await web.TCPSite(self._runner, host=self.settings.host, port=port).start()
+        logger.info("Приёмник уведомлений слушает %s:%s%s", self.settings.host, port, self.settings.path)
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        expected = f"Bearer {self.settings.secret}"
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), expected):
+            return web.json_response({"error": "unauthorized"}, status=401)
+        try:
+            payload = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return web.json_response({"error": "invalid json"}, status=400)
+        events = payload if isinstance(payload, list) else [payload]
+        errors = self._apply(events)
+        if errors:
+            return web.json_response({"applied": len(events) - len(errors), "errors": errors}, status=400)
+        return web.json_response({"applied": len(events)})
+
+    # --- SSE ----------------------------------------------------------------
+
+    async def _subscribe(self) -> None:
+        url = f"{self.backend.base_url}{self.settings.sse_path}"
+        headers = {"Accept": "text/event-stream"}
+        if self.settings.secret:
+            headers["Authorization"] = f"Bearer {self.settings.secret}"
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=self.settings.sse_read_timeout)
+        delay = self.settings.reconnect_delay
+        first = True
+        while True:
+            try:
+                async with self.backend.session.get(url, headers=headers, timeout=timeout) as response:
+                    if response.status != 200:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history, status=response.status,
+                        )
+                    self.connected = True
+                    delay = self.settings.reconnect_delay
+                    logger.info("Подписка на уведомления %s установлена", url)
+                    if not first:
+                        # Изменения за время обрыва не пришли: перечитываем данные
+                        await self.poll()
+                    first = False
+                    await self._read(response)
+                logger.warning("Поток уведомлений %s закрыт сервером", url)
+            except asyncio.CancelledError:
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning("Поток уведомлений %s недоступен: %s", url, e)
+            except Exception:
+                # Иначе подписка умрёт до перезапуска бота, останется только опрос
+                logger.exception("Ошибка обработки потока уведомлений %s, переподключение", url)
+            finally:
+                self.connected = False
+            first = False
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    async def _read(self, response: aiohttp.ClientResponse) -> None:
+        data: List[str] = []
+        async for raw in response.content:
+            line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+            if not line:
+                # Пустая строка завершает событие
+                if data:
+                    self._apply_text("\n".join(data))
+                    data = []
+            elif line.startswith("data:"):
+                data.append(line[5:].lstrip(" "))
+            # Комментарии (": ping"), event:, id: и retry: не нужны
+
+    def _apply_text(self, text: str) -> None:
+        try:
+            payload = json.loads(text)
+        except json.JSONDecodeError:
+            logger.warning("Некорректное уведомление в потоке: %s", text)
+            return
+        self._apply(payload if isinstance(payload, list) else [payload])
+
+    def _apply(self, events: List[Any]) -> List[str]:
+        errors = []
+        for event in events:
+            self.received += 1
+            try:
+                self.invalidator.apply(event)
+            except InvalidEvent as e:
+                logger.warning("Уведомление отклонено: %s", e)
+                errors.append(str(e))
+        return errors
+
+    # --- Опрос --------------------------------------------------------------
+
+    async def _poll_while_disconnected(self) -> None:
+        while True:
+            await asyncio.sleep(self.settings.poll_interval)
+            if not self.connected:
+                try:
+                    await self.poll()
+                except Exception:
+                    logger.exception("Ошибка опроса бэкенда при недоступном потоке уведомлений")
+
+    async def poll(self) -> Dict[str, int]:
+        """
+        Перечитать каталог и уже загруженные расписания и подставить изменения.
+        """
+        self.polls += 1
+        services, specialists = await asyncio.gather(
+            load_services_catalog(self.backend), load_specialists_catalog(self.backend),
+        )
+        if services is not None:
+            self.invalidator.replace_catalog("services", services)
+        if specialists is not None:
+            self.invalidator.replace_catalog("specialists", specialists)
+
+        specialist_ids = self.invalidator.schedules.specialist_ids()
+        results = await asyncio.gather(
+            *(fetch_work_schedule(self.backend, specialist_id) for specialist_id in specialist_ids),
+            return_exceptions=True,
+        )
+        changed = 0
+        for specialist_id, entries in zip(specialist_ids, results):
+            if isinstance(entries, BaseException) or entries is None:
+                continue
+            changed += self.invalidator.replace_schedule(specialist_id, entries)
+        logger.info("Опрос бэкенда: расписаний проверено %d, изменилось %d", len(specialist_ids), changed)
+        return {"schedules": len(specialist_ids), "changed": changed}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected": self.connected,
+            "received": self.received,
+            "reconnects": self.reconnects,
+            "polls": self.polls,
+            **self.invalidator.stats(),
+        }
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from core.config_data.config import Webhook
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """
+    Обработчик вебхука Telegram с ограничением параллельной обработки.
+
+    Доставка подтверждается ответом 200 сразу после разбора JSON, сама
+    обработка идёт в фоне, и одновременно выполняется не больше
+    `max_concurrency` апдейтов. При остановке сервер дожидается уже
+    принятых апдейтов не дольше `drain_timeout` секунд.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        max_concurrency: int,
+        drain_timeout: float,
+        secret_token: Optional[str] = None,
+        **data: Any,
+    ) -> None:
+        super().__init__(
+            dispatcher=dispatcher, bot=bot, handle_in_background=True, secret_token=secret_token, **data,
+        )
+        self.drain_timeout = drain_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.processed = 0
+        self.failed = 0
+
+    async def _background_feed_update(self, bot: Bot, update: Dict[str, Any]) -> None:
+        async with self._semaphore:
+            try:
+                await super()._background_feed_update(bot=bot, update=update)
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("Ошибка обработки апдейта %s", update.get("update_id"))
+
+    async def close(self) -> None:
+        pending = set(self._background_feed_update_tasks)
+        if pending:
+            logger.info("Ожидаем завершения %d апдейтов...", len(pending))
+            _, pending = await asyncio.wait(pending, timeout=self.drain_timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning("Прервано апдейтов при остановке: %d", len(pending))
+            await asyncio.gather(*pending, return_exceptions=True)
+        await super().close()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "processed": self.processed,
+            "failed": self.failed,
+            "in_progress": len(self._background_feed_update_tasks),
+        }
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, webhook: Webhook, **data: Any) -> None:
+    """
+    Зарегистрировать вебхук в Telegram и обслуживать его до отмены.
+    """
+    handler = BoundedRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        max_concurrency=webhook.max_concurrency,
+        drain_timeout=webhook.drain_timeout,
+        secret_token=webhook.secret or None,
+        **data,
+    )
+    app = web.Application()
+    handler.register(app, path=webhook.path)
+    setup_application(app, dp, bot=bot, **data)
+
+    runner = web.AppRunner(app, handle_signals=False)
+    await runner.setup()
+    site = web.TCPSite(runner, host=webhook.host, port=webhook.port)
+    await site.start()
+    await bot.set_webhook(
+        url=f"{webhook.url.rstrip('/')}{webhook.path}",
+        secret_token=webhook.secret or None,
+        allowed_updates=dp.resolve_used_update_types(),
+    )
+    logger.info("Вебхук слушает %s:%s%s", webhook.host, webhook.port, webhook.path)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        # on_shutdown приложения дожидается фоновых апдейтов и останавливает диспетчер
+        await runner.cleanup()
+        logger.info("Статистика вебхука: %s", handler.stats())
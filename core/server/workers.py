@@ -0,0 +1,263 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import GetUpdates
+from aiohttp import web
+
+from core.config_data.config import Webhook, Workers
+
+logger = logging.getLogger(__name__)
+
+# Сигнал воркеру завершить работу
+STOP = None
+
+
+def update_chat_id(update: Dict[str, Any]) -> int:
+    """
+    ID чата апдейта (или пользователя, если чата нет) для выбора воркера.
+    """
+    for name, event in update.items():
+        if name == "update_id" or not isinstance(event, dict):
+            continue
+        chat = event.get("chat") or (event.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+        user = event.get("from") or event.get("user")
+        if user:
+            return user["id"]
+    return 0
+
+
+class Supervisor:
+    """
+    Запускает `count` процессов-воркеров и раздаёт им апдейты.
+
+    Апдейт уходит воркеру `chat_id % count`, поэтому состояние диалога
+    пользователя всегда живёт в одном процессе. Упавший воркер
+    перезапускается с той же очередью. Воркеры периодически присылают
+    счётчики обработанных апдейтов; супервизор пишет их в лог вместе
+    с глубиной очередей.
+    """
+
+    def __init__(self, workers: Workers, target: Callable[..., None]):
+        self.settings = workers
+        self.target = target
+        self._context = multiprocessing.get_context("spawn")
+        self.queues = [self._context.Queue(maxsize=workers.queue_size) for _ in range(workers.count)]
+        self.reports = self._context.Queue()
+        self.processes: List[Optional[multiprocessing.Process]] = [None] * workers.count
+        self.restarts = [0] * workers.count
+        self.routed = [0] * workers.count
+        self.dropped = 0
+        self._last: Dict[int, Dict[str, Any]] = {}
+
+    def start(self) -> None:
+        for index in range(self.settings.count):
+            self._spawn(index)
+
+    def _spawn(self, index: int) -> None:
+        process = self._context.Process(
+            target=self.target,
+            args=(index, self.queues[index], self.reports),
+            name=f"bot-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[index] = process
+        logger.info("Воркер %d запущен (pid %s)", index, process.pid)
+
+    def route(self, update: Dict[str, Any]) -> None:
+        index = update_chat_id(update) % self.settings.count
+        try:
+            self.queues[index].put_nowait(update)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Очередь воркера %d переполнена, апдейт %s отброшен", index, update.get("update_id"))
+            return
+        self.routed[index] += 1
+
+    async def monitor(self) -> None:
+        """
+        Перезапускать упавшие воркеры и собирать их статистику.
+        """
+        last_report = time.monotonic()
+        while True:
+            await asyncio.sleep(1.0)
+            for index, process in enumerate(self.processes):
+                if process is not None and not process.is_alive():
+                    logger.error("Воркер %d завершился с кодом %s, перезапуск", index, process.exitcode)
+                    self.restarts[index] += 1
+                    self._spawn(index)
+            self._collect_reports()
+            if time.monotonic() - last_report >= self.settings.stats_interval:
+                last_report = time.monotonic()
+                logger.info("Статистика воркеров: %s", self.stats())
+
+    def _collect_reports(self) -> None:
+        while True:
+            try:
+                report = self.reports.get_nowait()
+            except queue.Empty:
+                return
+            self._last[report["worker"]] = report
+
+    def stats(self) -> List[Dict[str, Any]]:
+        result = []
+        for index in range(self.settings.count):
+            report = self._last.get(index, {})
+            result.append({
+                "worker": index,
+                "routed": self.routed[index],
+                "processed": report.get("processed", 0),
+                "failed": report.get("failed", 0),
+                "updates_per_sec": report.get("updates_per_sec", 0.0),
+                "queue_depth": _qsize(self.queues[index]),
+                "restarts": self.restarts[index],
+            })
+        return result
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """
+        Остановить воркеры; не успевшие завершиться за `timeout` секунд снимаются.
+        """
+        deadline = time.monotonic() + timeout
+        for index, (q, process) in enumerate(zip(self.queues, self.processes)):
+            if process is None or not process.is_alive():
+                continue
+            try:
+                q.put(STOP, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                logger.warning("Очередь воркера %d переполнена, сигнал остановки не доставлен", index)
+        for process in self.processes:
+            if process is None:
+                continue
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning("Воркер %s не завершился вовремя, снимаем его", process.name)
+                process.terminate()
+                process.join(1.0)
+
+
+async def run_supervisor(
+    bot: Bot, dp: Dispatcher, workers: Workers, webhook: Webhook, target: Callable[..., None],
+) -> None:
+    """
+    Фронт-процесс: принимает апдейты (long polling или вебхук) и раздаёт их воркерам.
+    """
+    supervisor = Supervisor(workers, target)
+    supervisor.start()
+    monitor = asyncio.create_task(supervisor.monitor())
+    try:
+        if webhook.enabled:
+            await _receive_webhook(bot, dp, supervisor, webhook)
+        else:
+            await _receive_polling(bot, dp, supervisor)
+    finally:
+        monitor.cancel()
+        await asyncio.to_thread(supervisor.stop)
+        logger.info("Итоговая статистика воркеров: %s", supervisor.stats())
+
+
+async def _receive_polling(bot: Bot, dp: Dispatcher, supervisor: Supervisor) -> None:
+    await bot.delete_webhook()
+    allowed_updates = dp.resolve_used_update_types()
+    offset = None
+    while True:
+        try:
+            updates = await bot(GetUpdates(offset=offset, timeout=30, allowed_updates=allowed_updates))
+        except Exception:
+            logger.exception("Ошибка получения апдейтов, повтор через 1 с")
+            await asyncio.sleep(1.0)
+            continue
+        for update in updates:
+            supervisor.route(update.model_dump(mode="json", exclude_unset=True))
+            offset = update.update_id + 1
+
+
+async def _receive_webhook(bot: Bot, dp: Dispatcher, supervisor: Supervisor, webhook: Webhook) -> None:
+    async def handle(request: web.Request) -> web.Response:
+        if webhook.secret and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != webhook.secret:
+            return web.Response(body="Unauthorized", status=401)
+        supervisor.route(await request.json())
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_post(webhook.path, handle)
+    runner = web.AppRunner(app, handle_signals=False)
+    await runner.setup()
+    await web.TCPSite(runner, host=webhook.host, port=webhook.port).start()
+    await bot.set_webhook(
+        url=f"{webhook.url.rstrip('/')}{webhook.path}",
+        secret_token=webhook.secret or None,
+        allowed_updates=dp.resolve_used_update_types(),
+    )
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+async def serve_worker(
+    index: int, bot: Bot, dp: Dispatcher, updates: multiprocessing.Queue, reports: multiprocessing.Queue,
+    workers: Workers,
+) -> None:
+    """
+    Цикл воркера: берёт апдейты из своей очереди и обрабатывает их диспетчером.
+    """
+    semaphore = asyncio.Semaphore(workers.max_concurrency)
+    tasks = set()
+    processed = failed = 0
+    last_processed, last_report = 0, time.monotonic()
+
+    async def feed(update: Dict[str, Any]) -> None:
+        nonlocal processed, failed
+        try:
+            await dp.feed_raw_update(bot, update)
+            processed += 1
+        except Exception:
+            failed += 1
+            logger.exception("Воркер %d: ошибка обработки апдейта %s", index, update.get("update_id"))
+        finally:
+            semaphore.release()
+
+    await dp.emit_startup(bot=bot)
+    try:
+        while True:
+            try:
+                update = await asyncio.to_thread(updates.get, True, 1.0)
+            except queue.Empty:
+                pass
+            else:
+                if update is STOP:
+                    break
+                await semaphore.acquire()
+                task = asyncio.create_task(feed(update))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            now = time.monotonic()
+            if now - last_report >= 1.0:
+                reports.put({
+                    "worker": index,
+                    "processed": processed,
+                    "failed": failed,
+                    "updates_per_sec": (processed - last_processed) / (now - last_report),
+                })
+                last_processed, last_report = processed, now
+        if tasks:
+            await asyncio.wait(tasks)
+    finally:
+        await dp.emit_shutdown(bot=bot)
+        await bot.session.close()
+
+
+def _qsize(q: multiprocessing.Queue) -> int:
+    try:
+        return q.qsize()
+    except NotImplementedError:  # macOS
+        return -1
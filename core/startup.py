@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+from core.api.client import BackendClient
+from core.cache.schedule import ScheduleIndex
+from core.cache.swr import SWRCache
+from core.config_data.config import Startup
+from core.dialogs.servises_dialog import day_names, month_names
+from core.handlers.services_handlers.schedule import load_schedule
+from core.handlers.services_handlers.service import load_services_catalog
+from core.handlers.services_handlers.specialists import load_specialists_catalog
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """
+    Время этапов запуска для одной строки в логе.
+    """
+
+    def __init__(self):
+        self.steps: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.steps.append((name, seconds))
+
+    def summary(self) -> str:
+        total = sum(seconds for _, seconds in self.steps)
+        parts = ", ".join(f"{name} {seconds * 1e3:.0f} мс" for name, seconds in self.steps)
+        return f"{parts}; всего {total * 1e3:.0f} мс"
+
+
+async def warm_up(
+    backend: BackendClient,
+    catalog: SWRCache,
+    schedules: ScheduleIndex,
+    settings: Startup,
+) -> Dict[str, int]:
+    """
+    Заполнить кэши до приёма апдейтов: каталог, расписания всех
+    специалистов и названия дней и месяцев для календаря.
+
+    Ошибки загрузки не мешают запуску: недостающее загрузится
+    при первом обращении, как и без прогрева.
+    """
+    timer = StartupTimer()
+    with timer.step("каталог"):
+        services, specialists = await asyncio.gather(
+            catalog.get("services", lambda: load_services_catalog(backend)),
+            catalog.get("specialists", lambda: load_specialists_catalog(backend)),
+            return_exceptions=True,
+        )
+    loaded = 0
+    if specialists and not isinstance(specialists, BaseException):
+        with timer.step("расписания"):
+            results = await asyncio.gather(
+                *(load_schedule(backend, schedules, item.id) for item in specialists.items),
+                return_exceptions=True,
+            )
+        loaded = sum(not isinstance(result, BaseException) for result in results)
+    with timer.step("локали"):
+        for locale in settings.warmup_locales:
+            day_names(locale)
+            month_names(locale)
+    logger.info("Прогрев кэшей: %s", timer.summary())
+    return {
+        "services": len(services) if services and not isinstance(services, BaseException) else 0,
+        "specialists": len(specialists) if specialists and not isinstance(specialists, BaseException) else 0,
+        "schedules": loaded,
+    }
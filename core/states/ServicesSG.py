@@ -4,4 +4,6 @@ class ServicesSG(StatesGroup):
     set_specialist = State()
     set_services = State()
     set_date = State()
-    set_time = State()
\ No newline at end of file
+    set_time = State()
+    fast_service = State()
+    fast_slots = State()
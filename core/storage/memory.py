@@ -0,0 +1,137 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+SessionKey = Tuple[int, int, int, Optional[int], Optional[str]]
+
+# Значение не передано: оставить записанное ранее
+_KEEP = object()
+
+
+class _Session:
+    __slots__ = ("records", "last_access")
+
+    def __init__(self):
+        # destiny -> (state, data); в одной сессии лежат FSM, стеки и контексты диалогов
+        self.records: Dict[str, Tuple[Optional[str], Dict[str, Any]]] = {}
+        self.last_access = 0.0
+
+    def size(self) -> int:
+        return sum(_estimate_size(state, data) for state, data in self.records.values())
+
+
+class BoundedMemoryStorage(BaseStorage):
+    """
+    Хранилище FSM в памяти с ограничением размера.
+
+    Все записи одного пользователя в чате (FSM и данные aiogram_dialog)
+    составляют сессию. Сессия удаляется, если к ней не обращались
+    `idle_ttl` секунд или если число сессий превысило `max_sessions`
+    (удаляется давно не использовавшаяся). Размер сессий оценивается
+    только в `stats()` по `sys.getsizeof` ключей и значений верхнего
+    уровня: вложенные объекты не обходятся, поэтому оценка занижена.
+    """
+
+    def __init__(self, idle_ttl: float = 3600.0, max_sessions: int = 50000):
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[SessionKey, _Session]" = OrderedDict()
+        self.idle_evictions = 0
+        self.capacity_evictions = 0
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        self._put(key, state=state.state if isinstance(state, State) else state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return self._get(key)[0]
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        self._put(key, data=data.copy())
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return self._get(key)[1].copy()
+
+    async def close(self) -> None:
+        pass
+
+    def _get(self, key: StorageKey) -> Tuple[Optional[str], Dict[str, Any]]:
+        session = self._touch(_session_key(key), create=False)
+        if session is None:
+            return None, {}
+        return session.records.get(key.destiny, (None, {}))
+
+    def _put(self, key: StorageKey, state: Any = _KEEP, data: Any = _KEEP) -> None:
+        session = self._touch(_session_key(key), create=True)
+        if state is _KEEP or data is _KEEP:
+            old_state, old_data = session.records.get(key.destiny, (None, {}))
+            state = old_state if state is _KEEP else state
+            data = old_data if data is _KEEP else data
+        if state is None and not data:
+            session.records.pop(key.destiny, None)
+        else:
+            session.records[key.destiny] = (state, data)
+
+    def _touch(self, session_key: SessionKey, create: bool) -> Optional[_Session]:
+        now = time.monotonic()
+        session = self._sessions.get(session_key)
+        if session is not None and now - session.last_access > self.idle_ttl:
+            self._drop(session_key)
+            self.idle_evictions += 1
+            session = None
+        if session is None:
+            if not create:
+                return None
+            session = self._sessions[session_key] = _Session()
+            session.last_access = now
+            # Число сессий растёт только здесь, поэтому и вытесняем только здесь
+            self._evict()
+            return session
+        self._sessions.move_to_end(session_key)
+        session.last_access = now
+        return session
+
+    def _evict(self) -> None:
+        # Сессии упорядочены по последнему обращению: проверяем только начало
+        now = time.monotonic()
+        while self._sessions:
+            session_key, session = next(iter(self._sessions.items()))
+            if now - session.last_access > self.idle_ttl:
+                self.idle_evictions += 1
+            elif len(self._sessions) > self.max_sessions:
+                self.capacity_evictions += 1
+            else:
+                break
+            self._drop(session_key)
+
+    def _drop(self, session_key: SessionKey) -> None:
+        del self._sessions[session_key]
+
+    def stats(self) -> Dict[str, Any]:
+        sessions = len(self._sessions)
+        sizes = [session.size() for session in self._sessions.values()]
+        return {
+            "sessions": sessions,
+            "bytes_total": sum(sizes),
+            "bytes_per_session": sum(sizes) / sessions if sessions else 0,
+            "bytes_max_session": max(sizes, default=0),
+            "idle_evictions": self.idle_evictions,
+            "capacity_evictions": self.capacity_evictions,
+        }
+
+
+def _session_key(key: StorageKey) -> SessionKey:
+    return key.bot_id, key.chat_id, key.user_id, key.thread_id, key.business_connection_id
+
+
+def _estimate_size(state: Optional[str], data: Dict[str, Any]) -> int:
+    try:
+        return sys.getsizeof(state) + sys.getsizeof(data) + sum(
+            sys.getsizeof(name) + sys.getsizeof(value) for name, value in data.items()
+        )
+    except Exception:
+        # Объект с неисправным __sizeof__ не должен ломать запись: просто не учитываем его
+        return 0
@@ -0,0 +1,61 @@
+import time
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from core import tracing
+from core.metrics import FSM_OPERATIONS, FSM_SECONDS, REGISTRY
+
+
+class MeteredStorage(BaseStorage):
+    """
+    Обёртка хранилища FSM: число и время операций по видам в метриках
+    и спаны операций в трассировке апдейта.
+
+    Остальные атрибуты (например, `stats`) берутся у исходного хранилища.
+    """
+
+    def __init__(self, storage: BaseStorage):
+        self.storage = storage
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        started = time.perf_counter()
+        try:
+            await self.storage.set_state(key, state)
+        finally:
+            _observe("set_state", started)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        started = time.perf_counter()
+        try:
+            return await self.storage.get_state(key)
+        finally:
+            _observe("get_state", started)
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        started = time.perf_counter()
+        try:
+            await self.storage.set_data(key, data)
+        finally:
+            _observe("set_data", started)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            return await self.storage.get_data(key)
+        finally:
+            _observe("get_data", started)
+
+    async def close(self) -> None:
+        await self.storage.close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.storage, name)
+
+
+def _observe(operation: str, started: float) -> None:
+    finished = time.perf_counter()
+    if REGISTRY.enabled:
+        FSM_SECONDS.labels(operation).observe(finished - started)
+        FSM_OPERATIONS.labels(operation).inc()
+    tracing.record(operation, "fsm", started, finished)
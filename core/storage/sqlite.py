@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import pickle
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm (
+    key   TEXT PRIMARY KEY,
+    state TEXT,
+    data  BLOB
+) WITHOUT ROWID
+"""
+
+
+class _Record:
+    __slots__ = ("state", "data", "dirty")
+
+    def __init__(self, state: Optional[str] = None, data: Optional[Dict[str, Any]] = None):
+        self.state = state
+        self.data = data if data is not None else {}
+        self.dirty = False
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    Файловое хранилище FSM на SQLite (WAL) с кэшем обратной записи.
+
+    Чтение и запись идут в кэш в памяти; изменённые записи сбрасываются
+    в базу пачкой раз в `flush_interval` секунд или при накоплении
+    `batch_size` изменений, поэтому несколько `update_data` одного
+    пользователя между сбросами дают одну запись на диск. Данные
+    сериализуются pickle. Через это же хранилище aiogram_dialog
+    сохраняет стеки и контексты диалогов.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 1.0,
+        batch_size: int = 500,
+        cache_size: int = 50000,
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.key_builder = DefaultKeyBuilder(
+            with_bot_id=True, with_business_connection_id=True, with_destiny=True,
+        )
+        self._cache: "OrderedDict[str, _Record]" = OrderedDict()
+        self._dirty: Dict[str, _Record] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm-sqlite")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self.flushes = 0
+        self.rows_written = 0
+
+    # --- BaseStorage -------------------------------------------------
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._record(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(key, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._record(key)).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record = await self._record(key)
+        record.data = data.copy()
+        self._mark_dirty(key, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._record(key)).data.copy()
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._flush_task is not None:
+            # Цикл сброса завершится сам после пробуждения
+            self._wakeup.set()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=True)
+
+    # --- кэш и сброс -------------------------------------------------
+
+    async def flush(self) -> None:
+        """
+        Записать все накопленные изменения одной транзакцией.
+        """
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            batch, self._dirty = self._dirty, {}
+            rows = []
+            for name, record in batch.items():
+                record.dirty = False
+                rows.append((name, record.state, _dumps(record.data)))
+            try:
+                await self._run(self._write_rows, rows)
+            except Exception:
+                # Возвращаем пачку в очередь, не затирая более новые изменения
+                for name, record in batch.items():
+                    record.dirty = True
+                    self._dirty.setdefault(name, record)
+                raise
+            self.flushes += 1
+            self.rows_written += len(rows)
+            self._evict()
+
+    async def _record(self, key: StorageKey) -> _Record:
+        name = self.key_builder.build(key)
+        record = self._cache.get(name)
+        if record is not None:
+            self._cache.move_to_end(name)
+            return record
+
+        row = await self._run(self._read_row, name)
+        # Пока шло чтение, запись могла появиться в кэше
+        record = self._cache.get(name)
+        if record is None:
+            record = _Record(row[0], _loads(row[1])) if row else _Record()
+            self._cache[name] = record
+            self._evict()
+        return record
+
+    def _mark_dirty(self, key: StorageKey, record: _Record) -> None:
+        record.dirty = True
+        self._dirty[self.key_builder.build(key)] = record
+        if not self._closed and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self._flush_loop())
+        if len(self._dirty) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _flush_loop(self) -> None:
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Не удалось записать состояние FSM в %s", self.path)
+
+    def _evict(self) -> None:
+        # Вытесняем только уже записанные на диск записи
+        while len(self._cache) > self.cache_size:
+            name, record = next(iter(self._cache.items()))
+            if record.dirty:
+                break
+            del self._cache[name]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "cached": len(self._cache),
+            "dirty": len(self._dirty),
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+        }
+
+    # --- SQLite (в отдельном потоке) ---------------------------------
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _read_row(self, name: str) -> Optional[Tuple[Optional[str], bytes]]:
+        return self._connection().execute(
+            "SELECT state, data FROM fsm WHERE key = ?", (name,),
+        ).fetchone()
+
+    def _write_rows(self, rows: List[Tuple[str, Optional[str], bytes]]) -> None:
+        conn = self._connection()
+        empty = _dumps({})
+        with conn:
+            conn.executemany(
+                "DELETE FROM fsm WHERE key = ?",
+                [(name,) for name, state, data in rows if state is None and data == empty],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO fsm (key, state, data) VALUES (?, ?, ?)",
+                [row for row in rows if not (row[1] is None and row[2] == empty)],
+            )
+
+
+def _dumps(data: Dict[str, Any]) -> bytes:
+    return pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _loads(blob: Optional[bytes]) -> Dict[str, Any]:
+    return pickle.loads(blob) if blob else {}
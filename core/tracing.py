@@ -0,0 +1,200 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from contextvars import ContextVar, Token
+from typing import Any, Dict, List, Optional
+
+from core.config_data.config import Tracing
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+
+
+class Trace:
+    """
+    Спаны одного апдейта в формате Chrome Trace Event.
+
+    Апдейт показывается отдельным процессом (`pid`), каждая задача asyncio
+    внутри него — отдельным потоком, чтобы параллельные загрузки не
+    перекрывали друг друга на одной дорожке.
+    """
+    __slots__ = ("pid", "events", "closed", "_tids")
+
+    def __init__(self, pid: int, title: str):
+        self.pid = pid
+        self.closed = False
+        self._tids: Dict[int, int] = {}
+        self.events: List[Dict[str, Any]] = [
+            {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": title}},
+        ]
+
+    def add(self, name: str, category: str, start: float, end: float, args: Optional[Dict[str, Any]] = None) -> None:
+        if self.closed:
+            # Фоновая задача пережила апдейт; файл уже мог быть записан
+            return
+        task = asyncio.current_task()
+        key = id(task) if task is not None else 0
+        tid = self._tids.get(key)
+        if tid is None:
+            tid = self._tids[key] = len(self._tids) + 1
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": self.pid,
+            "tid": tid,
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+
+class _Span:
+    __slots__ = ("trace", "name", "category", "args", "start")
+
+    def __init__(self, trace: Trace, name: str, category: str, args: Optional[Dict[str, Any]]):
+        self.trace = trace
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.args = {**(self.args or {}), "error": exc_type.__name__}
+        self.trace.add(self.name, self.category, self.start, time.perf_counter(), self.args)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def current() -> Optional[Trace]:
+    return _current.get()
+
+
+def activate(trace: Trace) -> Token:
+    return _current.set(trace)
+
+
+def deactivate(token: Token) -> None:
+    _current.reset(token)
+
+
+def span(name: str, category: str, args: Optional[Dict[str, Any]] = None):
+    """
+    Контекстный менеджер спана; без активной трассировки ничего не делает.
+    """
+    trace = _current.get()
+    if trace is None:
+        return _NULL_SPAN
+    return _Span(trace, name, category, args)
+
+
+def record(name: str, category: str, start: float, end: Optional[float] = None, args: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Добавить спан с уже измеренным началом (`time.perf_counter()`).
+    """
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, category, start, end if end is not None else time.perf_counter(), args)
+
+
+class Tracer:
+    """
+    Выборочная трассировка апдейтов с записью в файлы Chrome Trace / Perfetto.
+
+    Трассируется доля `sample_rate` апдейтов. Готовые трассировки копятся
+    в памяти и пишутся в `directory` (в пуле потоков) по `updates_per_file`
+    штук или раз в `flush_interval` секунд; хранятся последние `max_files`
+    файлов. Файлы открываются в chrome://tracing или ui.perfetto.dev.
+    """
+
+    def __init__(self, settings: Tracing):
+        self.settings = settings
+        self._pending: List[Trace] = []
+        self._next_pid = 1
+        self._last_flush = time.monotonic()
+        self._writes: set = set()
+        self._sequence = 0
+        self.sampled = 0
+        self.files = 0
+
+    def start(self, title: str) -> Optional[Trace]:
+        if random.random() >= self.settings.sample_rate:
+            return None
+        trace = Trace(self._next_pid, title)
+        self._next_pid += 1
+        self.sampled += 1
+        return trace
+
+    def finish(self, trace: Trace) -> None:
+        trace.closed = True
+        self._pending.append(trace)
+        if (
+            len(self._pending) >= self.settings.updates_per_file
+            or time.monotonic() - self._last_flush >= self.settings.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        traces, self._pending = self._pending, []
+        events = [event for trace in traces for event in trace.events]
+        self._sequence += 1
+        task = asyncio.get_running_loop().run_in_executor(None, self._write, events, self._sequence)
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    def _write(self, events: List[Dict[str, Any]], sequence: int) -> None:
+        os.makedirs(self.settings.directory, exist_ok=True)
+        name = f"trace-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{sequence:05d}.json"
+        path = os.path.join(self.settings.directory, name)
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        except OSError:
+            logger.exception("Не удалось записать трассировку %s", path)
+            return
+        self.files += 1
+        self._rotate()
+
+    def _rotate(self) -> None:
+        names = sorted(
+            name for name in os.listdir(self.settings.directory)
+            if name.startswith("trace-") and name.endswith(".json")
+        )
+        for name in names[:-self.settings.max_files]:
+            try:
+                os.remove(os.path.join(self.settings.directory, name))
+            except OSError:
+                pass
+
+    async def close(self) -> None:
+        self.flush()
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {"sampled": self.sampled, "pending": len(self._pending), "files": self.files}